@@ -0,0 +1,84 @@
+"""
+Load test: requests/s and latency of database-backed endpoints under many concurrent clients.
+
+Needs httpx (`pip install httpx`, not in requirements.txt).
+Start the API first (e.g. `uvicorn main:app --port 8000`), then from backend/:
+    python -m benchmarks.bench_async_load [--base-url http://127.0.0.1:8000] [--clients 500]
+                                          [--seconds 15] [--path /scholarships/search?q=scholarship]
+
+Pass --base-url more than once to run the same load against several servers one after the
+other, e.g. a checkout on the old sync handlers on :8001 and the current async ones on :8000.
+Paths should miss the response cache (search, filter), otherwise the database isn't exercised.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/scholarships/search?q=scholarship&page_size=10",
+    "/api/programs/filter?page_size=20&total_mode=none&sort=name",
+]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_load(base_url: str, path: str, clients: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(path)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await client.get(path)  # warm up caches and the connection pool
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "errors": errors,
+        "p50": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99": _percentile(latencies, 0.99) * 1000 if latencies else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", action="append", dest="base_urls")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+    base_urls = args.base_urls or ["http://127.0.0.1:8000"]
+    paths = args.paths or DEFAULT_PATHS
+
+    print(f"{args.clients} concurrent clients, {args.seconds:.0f}s per run")
+    print(f"{'server':<24} {'path':<52} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for base_url in base_urls:
+        for path in paths:
+            r = asyncio.run(run_load(base_url, path, args.clients, args.seconds))
+            print(f"{base_url:<24} {path:<52} {r['rps']:>8.0f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Throughput of the per-row `upsert` + commit path vs `bulk_upsert` for program details.
+
+Writes synthetic rows with ids prefixed "bench-" into program_details (DATABASE_URL) and
+deletes them afterwards.  Run from backend/:  python -m benchmarks.bench_bulk_upsert [--rows 2000]
+"""
+import argparse
+import time
+
+from sqlalchemy import delete
+
+from db import SessionLocal
+from models.models import ProgramDetail, bulk_upsert
+
+
+def synthetic_entries(n: int, version: int):
+    for i in range(n):
+        yield {
+            "id": f"bench-{i}",
+            "attributes": {"name": f"Program {i}", "tuition": 20000 + i, "version": version},
+            "school": {"id": i % 300, "name": f"School {i % 300}"},
+            "program": {"level": "masters", "intakes": ["2025-09", "2026-01"]},
+            "program_requirements": {"ielts": 6.5, "gpa": 3.0},
+            "school_id": i % 300,
+        }
+
+
+def per_row(n: int, version: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        for entry in synthetic_entries(n, version):
+            ProgramDetail.upsert(db, entry)
+            db.commit()
+    return time.perf_counter() - start
+
+
+def bulk(n: int, version: int, chunk_size: int) -> float:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        bulk_upsert(db, ProgramDetail, synthetic_entries(n, version), chunk_size=chunk_size)
+    return time.perf_counter() - start
+
+
+def _clean():
+    with SessionLocal() as db:
+        db.execute(delete(ProgramDetail).where(ProgramDetail.id.like("bench-%")))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        _clean()
+        insert_row = per_row(args.rows, 1)
+        _clean()
+        insert_bulk = bulk(args.rows, 1, args.chunk_size)
+        # Rows now exist, so both passes below take the update branch.
+        update_row = per_row(args.rows, 2)
+        update_bulk = bulk(args.rows, 3, args.chunk_size)
+    finally:
+        _clean()
+
+    for label, row_s, bulk_s in (("insert", insert_row, insert_bulk), ("update", update_row, update_bulk)):
+        print(
+            f"{label}: per-row {args.rows / row_s:8.0f} rows/s   "
+            f"bulk (chunk {args.chunk_size}) {args.rows / bulk_s:8.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
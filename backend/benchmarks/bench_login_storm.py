@@ -0,0 +1,92 @@
+"""
+Login storm: /auth/login throughput and the latency of an unrelated endpoint meanwhile.
+
+Needs httpx (`pip install httpx`, not in requirements.txt).
+Start the API first (e.g. `uvicorn main:app --port 8000`), then from backend/:
+    python -m benchmarks.bench_login_storm [--base-url http://127.0.0.1:8000] [--clients 32]
+                                          [--seconds 15] [--probe /health]
+
+A verified benchmark user is created (or reset) directly in the database, so DATABASE_URL
+must point at the same database as the server. Run once with the server on the old sync
+handlers and once on the current ones to compare.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import httpx
+
+from db import SessionLocal
+from utils.auth_utils import BCRYPT_ROUNDS, hash_password
+from utils.crud_user import create_user, get_user_by_email
+
+EMAIL = "login-storm@example.com"
+PASSWORD = "bench-password-123"
+
+
+def _ensure_user():
+    with SessionLocal() as db:
+        user = get_user_by_email(db, EMAIL)
+        if user is None:
+            user = create_user(db, email=EMAIL, full_name="Bench", role="student", password_hash="")
+        user.password_hash = hash_password(PASSWORD)
+        user.is_verified = True
+        db.commit()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--probe", default="/health", help="unrelated endpoint sampled during the storm")
+    args = parser.parse_args()
+
+    _ensure_user()
+    stop = threading.Event()
+    logins, failures, probes = [], [0], []
+    lock = threading.Lock()
+
+    def storm():
+        with httpx.Client(base_url=args.base_url, timeout=60) as client:
+            while not stop.is_set():
+                start = time.perf_counter()
+                resp = client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                with lock:
+                    if resp.status_code == 200:
+                        logins.append(time.perf_counter() - start)
+                    else:
+                        failures[0] += 1
+
+    def probe():
+        with httpx.Client(base_url=args.base_url, timeout=60) as client:
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get(args.probe)
+                probes.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=storm) for _ in range(args.clients)] + [threading.Thread(target=probe)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"bcrypt rounds: {BCRYPT_ROUNDS}, clients: {args.clients}, duration: {args.seconds}s")
+    print(f"logins: {len(logins)} ok, {failures[0]} failed, {len(logins) / args.seconds:.1f}/s, "
+          f"median {statistics.median(logins) * 1000:.0f} ms" if logins else "logins: none succeeded")
+    if probes:
+        print(f"{args.probe}: {len(probes)} samples, p50 {_percentile(probes, 0.5):.1f} ms, "
+              f"p99 {_percentile(probes, 0.99):.1f} ms, max {max(probes):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-query latency of the in-memory program index (utils/program_index.py) on synthetic data.
+No database needed.  Run from backend/:  python -m benchmarks.bench_program_index [--programs 50000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from utils.program_index import ProgramIndex
+
+COUNTRIES = ["Canada", "Australia", "United States", "United Kingdom", "Germany", "Ireland", "New Zealand"]
+QUERIES = [
+    {},
+    {"country": "canada"},
+    {"school_name": "tech"},
+    {"min_fees": 20000, "max_fees": 30000},
+    {"school_name": "uni", "country": "united", "max_fees": 25000},
+    {"school_name": "ab"},
+]
+
+
+def synthetic_rows(n: int, schools: int):
+    rng = random.Random(42)
+    words = ["Tech", "State", "Royal", "Metro", "Coastal", "Northern", "Valley", "Capital", "Institute", "College"]
+    school_names = [f"{rng.choice(words)} {rng.choice(words)} University {i}" for i in range(schools)]
+    for i in range(n):
+        s = rng.randrange(schools)
+        tuition = rng.randrange(5000, 60000) if rng.random() > 0.05 else None
+        attrs = {"name": f"Program {rng.randrange(2000)}", "tuition": tuition, "school": {"name": school_names[s]}}
+        yield f"p{i:07d}", "programs", attrs, school_names[s], COUNTRIES[s % len(COUNTRIES)], tuition
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--programs", type=int, default=50000)
+    parser.add_argument("--schools", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    index = ProgramIndex()
+    start = time.perf_counter()
+    index.build(synthetic_rows(args.programs, args.schools))
+    print(f"built {args.programs} programs in {time.perf_counter() - start:.2f}s")
+
+    for params in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = index.query(offset=100, limit=50, **params)
+            samples.append((time.perf_counter() - start) * 1e6)
+        samples.sort()
+        print(
+            f"{str(params):60} total={result['total']:>6}  "
+            f"median={statistics.median(samples):7.1f}us  p99={samples[int(len(samples) * 0.99) - 1]:7.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Latency per page depth for /api/programs/filter: OFFSET paging vs keyset cursors.
+
+Needs DATABASE_URL pointing at a populated `programs` table and httpx (for TestClient).
+Run from backend/:  python -m benchmarks.bench_programs_pagination [--page-size 50] [--repeat 5]
+                                                                  [--total-mode exact|estimated|none]
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from db import SessionLocal
+from main import app
+from models.models import Program
+from utils.pagination import encode_cursor
+
+DEPTHS = [1, 10, 50, 100, 250, 500, 1000]
+
+
+def _time(client: TestClient, params: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get("/api/programs/filter", params=params)
+        samples.append((time.perf_counter() - start) * 1000)
+        resp.raise_for_status()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--total-mode", default="none", help="none isolates paging cost from COUNT(*)")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    with SessionLocal() as db:
+        total = db.query(Program).count()
+
+    print(f"programs: {total}, page_size: {args.page_size}, total_mode: {args.total_mode}")
+    print(f"{'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+    for page in DEPTHS:
+        offset = (page - 1) * args.page_size
+        if offset >= total:
+            break
+        offset_ms = _time(client, {"page": page, "page_size": args.page_size, "total_mode": args.total_mode}, args.repeat)
+
+        if page == 1:
+            cursor = ""
+        else:
+            # Boundary row = last row of the previous page (setup, not timed).
+            with SessionLocal() as db:
+                boundary = db.execute(
+                    select(Program.id).order_by(Program.id).offset(offset - 1).limit(1)
+                ).scalar_one()
+            cursor = encode_cursor("id", [boundary], "next")
+        cursor_ms = _time(client, {"cursor": cursor, "page_size": args.page_size, "total_mode": args.total_mode}, args.repeat)
+        print(f"{page:>6} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Payload size and cost of the program list endpoints with whole documents (`fields=*`) vs the
+default card projection (PROGRAM_LIST_FIELDS / PROGRAM_DETAIL_LIST_FIELDS in main.py).
+
+Writes synthetic programs and program details with ids prefixed "bench-proj-" (school id -4343)
+into DATABASE_URL and deletes them afterwards.
+Run from backend/:  python -m benchmarks.bench_projection [--programs 200] [--requests 100]
+
+"API cpu" is process CPU time in this process; "wall" includes the database round trip and
+Postgres' own work.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import delete
+
+from db import SessionLocal
+from main import (
+    PROGRAM_DETAIL_LIST_FIELDS, PROGRAM_LIST_FIELDS, _list_fields, _program_details_stmt, _program_items,
+    _program_offset_stmt,
+)
+from models.models import Program, ProgramDetail, bulk_upsert
+from utils.raw_json import dumps, fetch_json
+
+SCHOOL_ID = -4343
+SCHOOL_NAME = "Bench Projection School"
+WORDS = ["study", "campus", "research", "intake", "tuition", "visa", "credit", "semester", "thesis", "lab"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _program_attributes(rng: random.Random, i: int) -> dict:
+    # roughly the shape of an imported program: the card fields plus long detail-page content
+    return {
+        "name": f"Program {i}",
+        "programLevel": "Master's Degree",
+        "tuition": rng.randrange(10000, 60000),
+        "currency": "CAD",
+        "applicationFee": rng.choice([0, 100, 150]),
+        "minLength": 12,
+        "maxLength": 24,
+        "programIntakes": [{"month": m, "status": "open", "deadline": f"2025-{m:02d}-01"} for m in (1, 5, 9)],
+        "school": {
+            "id": SCHOOL_ID, "name": SCHOOL_NAME, "city": "Halifax", "province": "NS", "country": "Canada",
+            "countryCode": "CA", "logoThumbnailUrl": "https://example.com/logo.png",
+            "description": _text(rng, 150), "features": [_text(rng, 12) for _ in range(10)],
+        },
+        "description": _text(rng, 400),
+        "admissionRequirements": [{"type": f"req-{j}", "text": _text(rng, 40)} for j in range(8)],
+        "fees": [{"year": y, "amount": rng.randrange(10000, 60000), "note": _text(rng, 10)} for y in range(2021, 2026)],
+        "courses": [{"code": f"C{j:03d}", "title": _text(rng, 5), "summary": _text(rng, 30)} for j in range(20)],
+    }
+
+
+def synthetic_programs(n: int):
+    rng = random.Random(5)
+    for i in range(n):
+        yield {"id": f"bench-proj-{i:05d}", "type": "programs", "attributes": _program_attributes(rng, i)}
+
+
+def synthetic_program_details(n: int):
+    rng = random.Random(6)
+    for i in range(n):
+        attributes = _program_attributes(rng, i)
+        yield {
+            "id": f"bench-proj-{i:05d}",
+            "attributes": attributes,
+            "school": attributes["school"],
+            "program": {"overview": _text(rng, 300), "outcomes": [_text(rng, 20) for _ in range(10)]},
+            "program_requirements": {"documents": [{"name": _text(rng, 3), "text": _text(rng, 40)} for _ in range(6)]},
+            "school_id": SCHOOL_ID,
+        }
+
+
+def program_page(db, fields: str, page_size: int) -> bytes:
+    shape = (True, False, False, False)
+    rows = db.execute(
+        _program_offset_stmt(shape, "id", fields),
+        {"school_name": SCHOOL_NAME, "offset": 0, "limit": page_size + 1},
+    ).all()
+    return dumps({"items": _program_items(rows[:page_size], fields)})
+
+
+def program_details(db, fields: str) -> bytes:
+    return fetch_json(db, _program_details_stmt(fields), {"school_id": SCHOOL_ID})
+
+
+def measure(fn, requests: int) -> tuple[float, float, int]:
+    with SessionLocal() as db:
+        size = len(fn(db))  # warm up
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(requests):
+            fn(db)
+        return ((time.process_time() - cpu) / requests * 1000, (time.perf_counter() - wall) / requests * 1000, size)
+
+
+def _clean():
+    with SessionLocal() as db:
+        db.execute(delete(Program).where(Program.id.like("bench-proj-%")))
+        db.execute(delete(ProgramDetail).where(ProgramDetail.id.like("bench-proj-%")))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--programs", type=int, default=200, help="rows per list (the filter's max page size)")
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    try:
+        _clean()
+        with SessionLocal() as db:
+            bulk_upsert(db, Program, synthetic_programs(args.programs))
+            bulk_upsert(db, ProgramDetail, synthetic_program_details(args.programs))
+        cases = [
+            ("programs filter", "fields=*", lambda db: program_page(db, "", args.programs)),
+            ("programs filter", "default", lambda db: program_page(db, _list_fields(None, PROGRAM_LIST_FIELDS), args.programs)),
+            ("by-school", "fields=*", lambda db: program_details(db, "")),
+            ("by-school", "default", lambda db: program_details(db, _list_fields(None, PROGRAM_DETAIL_LIST_FIELDS))),
+        ]
+        print(f"{'endpoint':<16} {'fields':<9} {'body KB':>8} {'API cpu ms':>11} {'wall ms':>8}")
+        for label, variant, fn in cases:
+            cpu_ms, wall_ms, size = measure(fn, args.requests)
+            print(f"{label:<16} {variant:<9} {size / 1024:>8.1f} {cpu_ms:>11.2f} {wall_ms:>8.2f}")
+    finally:
+        _clean()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Python-side cost per request of the hot catalogue queries: building an ORM query and hydrating
+entities on every request (the old handlers) vs the pre-built column-only statements in main.py.
+
+Uses whatever is in DATABASE_URL (read-only); pick ids that exist:
+    python -m benchmarks.bench_query_build [--school-group-id 10] [--requests 500]
+
+Times are process CPU, so Postgres' own work is excluded.
+"""
+import argparse
+import time
+
+from sqlalchemy import func
+
+from db import SessionLocal
+from main import SCHOLARSHIPS_BY_SCHOOL, _program_count_stmt, _program_keyset_stmt, _program_offset_stmt
+from models.models import Program, ScholarshipModel
+
+
+def legacy_scholarships(db, school_id: int):
+    scholarships = db.query(ScholarshipModel).filter(ScholarshipModel.schoolGroupId == school_id).all()
+    return [
+        {
+            "id": sch.id, "title": sch.title, "description": sch.description,
+            "awardAmountFrom": sch.awardAmountFrom, "awardAmountTo": sch.awardAmountTo,
+            "awardAmountType": sch.awardAmountType, "schoolGroupId": sch.schoolGroupId,
+            "schoolGroupName": sch.schoolGroupName, "sourceUrl": sch.sourceUrl, "updatedAt": sch.updatedAt,
+        }
+        for sch in scholarships
+    ]
+
+
+def prebuilt_scholarships(db, school_id: int):
+    return [dict(row) for row in db.execute(SCHOLARSHIPS_BY_SCHOOL, {"school_id": school_id}).mappings()]
+
+
+def legacy_filter(db, country: str, min_fees: int, page_size: int):
+    query = db.query(Program).filter(Program.country.ilike(f"%{country}%"), Program.tuition >= min_fees)
+    total = query.count()
+    sort_expr = func.coalesce(Program.attributes["name"].astext, "")
+    rows = query.order_by(sort_expr, Program.id).offset(page_size).limit(page_size + 1).all()
+    return total, [{"id": p.id, "type": p.type, "attributes": p.attributes} for p in rows[:page_size]]
+
+
+def prebuilt_filter(db, country: str, min_fees: int, page_size: int):
+    shape = (False, True, True, False)
+    params = {"country": f"%{country}%", "min_fees": min_fees}
+    total = db.execute(_program_count_stmt(shape), params).scalar()
+    rows = db.execute(
+        _program_offset_stmt(shape, "name", ""), {**params, "offset": page_size, "limit": page_size + 1}
+    ).all()
+    return total, [{"id": r.id, "type": r.type, "attributes": r.attributes} for r in rows[:page_size]]
+
+
+def legacy_keyset(db, page_size: int):
+    sort_expr = func.coalesce(Program.attributes["name"].astext, "")
+    rows = db.query(Program, sort_expr).order_by(sort_expr, Program.id).limit(page_size + 1).all()
+    return [{"id": p.id, "type": p.type, "attributes": p.attributes} for p, _ in rows[:page_size]]
+
+
+def prebuilt_keyset(db, page_size: int):
+    rows = db.execute(_program_keyset_stmt((False, False, False, False), "name", None, ""), {"limit": page_size + 1}).all()
+    return [{"id": r.id, "type": r.type, "attributes": r.attributes} for r in rows[:page_size]]
+
+
+def cpu_ms(fn, requests: int) -> float:
+    with SessionLocal() as db:
+        fn(db)  # warm up: compiled cache, connection
+        start = time.process_time()
+        for _ in range(requests):
+            fn(db)
+            db.expunge_all()  # each request gets a fresh session, so no identity-map hits
+        return (time.process_time() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--school-group-id", type=int, default=10)
+    parser.add_argument("--country", default="can")
+    parser.add_argument("--min-fees", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    cases = [
+        ("scholarships by school", lambda db: legacy_scholarships(db, args.school_group_id),
+         lambda db: prebuilt_scholarships(db, args.school_group_id)),
+        ("programs filter (count + page)", lambda db: legacy_filter(db, args.country, args.min_fees, args.page_size),
+         lambda db: prebuilt_filter(db, args.country, args.min_fees, args.page_size)),
+        ("programs keyset first page", lambda db: legacy_keyset(db, args.page_size),
+         lambda db: prebuilt_keyset(db, args.page_size)),
+    ]
+    print(f"{'query':<32} {'ORM ms':>8} {'prebuilt ms':>12}")
+    for label, legacy, prebuilt in cases:
+        with SessionLocal() as db:
+            assert legacy(db) == prebuilt(db), f"{label}: results differ"
+        print(f"{label:<32} {cpu_ms(legacy, args.requests):>8.3f} {cpu_ms(prebuilt, args.requests):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
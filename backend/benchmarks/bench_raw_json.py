@@ -0,0 +1,122 @@
+"""
+Per-request cost of /universities/{id} and /api/programs/by-school/{id} bodies: the old path
+(JSONB parsed into dicts, jsonable_encoder, json.dumps) vs the raw passthrough (document built
+by Postgres, selected as text, sent as bytes). The response cache is bypassed.
+
+Writes synthetic records with ids prefixed "bench-raw-" (school id -4242 for program details)
+into DATABASE_URL and deletes them afterwards.
+Run from backend/:  python -m benchmarks.bench_raw_json [--included 400] [--programs 200] [--requests 200]
+
+"API cpu" is process CPU time in this process (what a worker spends); "wall" includes the
+database round trip and Postgres' own work.
+"""
+import argparse
+import json
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+
+from db import SessionLocal
+from main import PROGRAM_DETAILS_JSON, UNIVERSITY_JSON
+from models.models import ProgramDetail, UniversityModel, bulk_upsert
+from utils.raw_json import fetch_json
+
+SCHOOL_ID = -4242
+
+
+def _blob(rng: random.Random, i: int) -> dict:
+    return {
+        "name": f"Item {i}",
+        "description": " ".join(rng.choice(["study", "campus", "research", "intake", "tuition", "visa"]) for _ in range(40)),
+        "fees": [{"year": y, "amount": rng.randrange(10000, 60000), "currency": "CAD"} for y in range(2021, 2026)],
+        "tags": [f"tag-{rng.randrange(50)}" for _ in range(8)],
+        "meta": {"score": rng.random(), "verified": rng.random() > 0.5, "nested": {"level": rng.randrange(5)}},
+    }
+
+
+def synthetic_university(n_included: int) -> dict:
+    rng = random.Random(7)
+    return {
+        "id": "bench-raw-uni",
+        "type": "schools",
+        "attributes": _blob(rng, 0),
+        "relationships": {"programs": {"data": [{"id": str(i), "type": "programs"} for i in range(n_included)]}},
+        "included": [{"id": str(i), "type": "programs", "attributes": _blob(rng, i)} for i in range(n_included)],
+    }
+
+
+def synthetic_programs(n: int):
+    rng = random.Random(11)
+    for i in range(n):
+        yield {
+            "id": f"bench-raw-{i}",
+            "attributes": _blob(rng, i),
+            "school": {"id": SCHOOL_ID, "name": "Bench School"},
+            "program": _blob(rng, i),
+            "program_requirements": {"ielts": 6.5, "gpa": 3.0, "documents": [_blob(rng, j) for j in range(3)]},
+            "school_id": SCHOOL_ID,
+        }
+
+
+def legacy_university(db, school_id: str) -> bytes:
+    uni = db.query(UniversityModel).filter(UniversityModel.id == school_id).first()
+    payload = {"id": uni.id, "type": uni.type, "attributes": uni.attributes,
+               "relationships": uni.relationships, "included": uni.included}
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+def legacy_programs(db, school_id: int) -> bytes:
+    programs = db.query(ProgramDetail).filter(ProgramDetail.school_id == school_id).all()
+    payload = [{"id": p.id, "type": None, "attributes": p.attributes, "school": p.school,
+                "program": p.program, "program_requirements": p.program_requirements} for p in programs]
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+def measure(fn, requests: int) -> tuple[float, float, int]:
+    with SessionLocal() as db:
+        size = len(fn(db))  # warm up
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(requests):
+            fn(db)
+            db.expunge_all()  # like a fresh request session: no identity-map hits
+        return ((time.process_time() - cpu) / requests * 1000, (time.perf_counter() - wall) / requests * 1000, size)
+
+
+def _clean():
+    with SessionLocal() as db:
+        db.execute(delete(UniversityModel).where(UniversityModel.id.like("bench-raw-%")))
+        db.execute(delete(ProgramDetail).where(ProgramDetail.id.like("bench-raw-%")))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--included", type=int, default=400, help="included[] entries in the university record")
+    parser.add_argument("--programs", type=int, default=200, help="program details for the school")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        _clean()
+        with SessionLocal() as db:
+            bulk_upsert(db, UniversityModel, [synthetic_university(args.included)])
+            bulk_upsert(db, ProgramDetail, synthetic_programs(args.programs))
+        cases = [
+            ("university", lambda db: legacy_university(db, "bench-raw-uni"),
+             lambda db: fetch_json(db, UNIVERSITY_JSON, {"id": "bench-raw-uni"})),
+            ("program details", lambda db: legacy_programs(db, SCHOOL_ID),
+             lambda db: fetch_json(db, PROGRAM_DETAILS_JSON, {"school_id": SCHOOL_ID})),
+        ]
+        print(f"{'endpoint':<16} {'path':<7} {'body KB':>8} {'API cpu ms':>11} {'wall ms':>8}")
+        for label, legacy, raw in cases:
+            for path, fn in (("legacy", legacy), ("raw", raw)):
+                cpu_ms, wall_ms, size = measure(fn, args.requests)
+                print(f"{label:<16} {path:<7} {size / 1024:>8.0f} {cpu_ms:>11.2f} {wall_ms:>8.2f}")
+    finally:
+        _clean()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Shortlist scoring on synthetic universities: the old per-object loop vs ShortlistCatalogue.
+No database needed.  Run from backend/:  python -m benchmarks.bench_shortlist [--universities 100000] [--k 20]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from models.models import University, ShortlistPreference, ShortlistItem
+from utils.shortlist import ShortlistCatalogue
+
+COUNTRIES = ["Canada", "Australia", "United States", "United Kingdom", "Germany", "Ireland", "New Zealand"]
+PREFS = [
+    ShortlistPreference(country="canada", budget=25000, program="Program 17"),
+    ShortlistPreference(country="Germany"),
+    ShortlistPreference(budget=15000),
+    ShortlistPreference(program="Program 3"),
+]
+
+
+def synthetic_universities(n: int, programs: int):
+    rng = random.Random(42)
+    for i in range(n):
+        yield University(
+            id=i,
+            name=f"University {i}",
+            country=rng.choice(COUNTRIES),
+            tuition=rng.randrange(5000, 60000),
+            programs=[f"Program {rng.randrange(programs)}" for _ in range(rng.randint(1, 8))],
+        )
+
+
+def legacy_score(unis, prefs):
+    # score_universities before the columnar rewrite
+    items = []
+    for u in unis:
+        score = 0.5
+        if prefs.country and prefs.country.lower() == u.country.lower():
+            score += 0.2
+        if prefs.program and prefs.program in u.programs:
+            score += 0.2
+        if prefs.budget and u.tuition <= prefs.budget:
+            score += 0.1
+        items.append(ShortlistItem(university=u.name, country=u.country, tuition=u.tuition, programs=u.programs, match_score=round(score, 2)))
+    return sorted(items, key=lambda x: x.match_score, reverse=True)
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universities", type=int, default=100000)
+    parser.add_argument("--programs", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    unis = list(synthetic_universities(args.universities, args.programs))
+    start = time.perf_counter()
+    catalogue = ShortlistCatalogue(unis)
+    print(f"universities: {len(unis)}, catalogue build: {(time.perf_counter() - start) * 1000:.0f} ms, k: {args.k}")
+
+    print(f"{'preference':<60} {'loop ms':>9} {'numpy ms':>9}")
+    for prefs in PREFS:
+        expected = legacy_score(unis, prefs)[:args.k]
+        got = catalogue.shortlist(prefs, k=args.k)
+        assert [i.university for i in got] == [i.university for i in expected], "rankings differ"
+        loop_ms = _median_ms(lambda: legacy_score(unis, prefs), max(1, args.repeat // 10))
+        numpy_ms = _median_ms(lambda: catalogue.shortlist(prefs, k=args.k), args.repeat)
+        label = ", ".join(f"{k}={v}" for k, v in prefs.model_dump(exclude_none=True).items())
+        print(f"{label:<60} {loop_ms:>9.1f} {numpy_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+University page data in one round trip (/universities/{id}/full) vs the three requests the page
+used to make (/universities/{id}, /scholarships/{id}, /api/programs/by-school/{id}), measured
+at the database layer with the response cache bypassed.
+
+Uses whatever is in DATABASE_URL (read-only); pick a university whose id is also its
+scholarships' schoolGroupId / its programs' school_id:
+    python -m benchmarks.bench_university_full --id 77 [--requests 300] [--fields programs.attributes.name]
+
+Add latency to the database (e.g. a remote server) to see the round trips dominate.
+"""
+import argparse
+import asyncio
+import time
+
+from db import AsyncSessionLocal, async_engine
+from main import (
+    PROGRAM_DETAILS_JSON, SCHOLARSHIPS_BY_SCHOOL, UNIVERSITY_FULL_SECTIONS, UNIVERSITY_JSON, _university_full_stmt,
+)
+from utils.projection import canonical_fields, parse_fields
+from utils.raw_json import dumps, fetch_json_async
+
+
+async def three_queries(db, school_id: str) -> int:
+    university = await fetch_json_async(db, UNIVERSITY_JSON, {"id": school_id})
+    rows = (await db.execute(SCHOLARSHIPS_BY_SCHOOL, {"school_id": int(school_id)})).mappings()
+    scholarships = dumps([dict(row) for row in rows])
+    programs = await fetch_json_async(db, PROGRAM_DETAILS_JSON, {"school_id": int(school_id)})
+    return len(university) + len(scholarships) + len(programs)
+
+
+async def one_statement(db, school_id: str, fields: str) -> int:
+    stmt = _university_full_stmt(fields, UNIVERSITY_FULL_SECTIONS[1:])
+    return len(await fetch_json_async(db, stmt, {"id": school_id, "school_group_id": int(school_id)}))
+
+
+async def measure(fn, requests: int) -> tuple[float, int]:
+    async with AsyncSessionLocal() as db:
+        size = await fn(db)  # warm up
+        start = time.perf_counter()
+        for _ in range(requests):
+            await fn(db)
+        return (time.perf_counter() - start) / requests * 1000, size
+
+
+async def run(args):
+    fields = canonical_fields(parse_fields(args.fields))
+    cases = [
+        ("3 queries", lambda db: three_queries(db, args.id)),
+        ("1 statement", lambda db: one_statement(db, args.id, "")),
+    ]
+    if fields:
+        cases.append((f"1 statement, fields={fields}", lambda db: one_statement(db, args.id, fields)))
+    print(f"{'fetch':<48} {'ms/page':>8} {'body KB':>8}")
+    for label, fn in cases:
+        ms, size = await measure(fn, args.requests)
+        print(f"{label:<48} {ms:>8.2f} {size / 1024:>8.1f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--id", required=True)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--fields", default="university.attributes.name,scholarships.title,programs.attributes.name")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
+import uuid
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from dotenv import load_dotenv
 from contextlib import contextmanager
 from models.models import AustraliaScholarship
+from utils.db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, install_ping
 
 load_dotenv()
 
@@ -11,10 +15,43 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL env var not set")
 
+# Pool settings apply to the sync and the async engine separately (per worker process).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))       # replace connections older than this (-1: never)
+DB_PING_INTERVAL = float(os.getenv("DB_PING_INTERVAL", "30"))     # ping connections idle longer than this; 0: every checkout
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0: server default
+# Behind a transaction-mode pooler (PgBouncer, Neon "-pooler" hosts): no session state, no named prepared statements.
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(DATABASE_URL, future=True, pool_pre_ping=True)
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_PING_INTERVAL <= 0,
+    }
+
+
+def _sync_connect_args() -> dict:
+    # Transaction poolers reject startup options; set statement_timeout on the role instead
+    # (ALTER ROLE ... SET statement_timeout = ...).
+    if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+engine = create_engine(
+    DATABASE_URL, future=True, poolclass=InstrumentedQueuePool, connect_args=_sync_connect_args(), **_pool_options()
+)
+if DB_PING_INTERVAL > 0:
+    install_ping(engine, DB_PING_INTERVAL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 Base.metadata.create_all(bind=engine)
@@ -31,3 +68,43 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+def _async_url(url: str):
+    """DATABASE_URL for asyncpg: swap the driver and move libpq-only options to connect args."""
+    url = make_url(url)
+    query = dict(url.query)
+    connect_args = {}
+    sslmode = query.pop("sslmode", None)
+    if sslmode:
+        connect_args["ssl"] = sslmode  # asyncpg accepts libpq sslmode names
+    query.pop("channel_binding", None)
+    if DB_PGBOUNCER:
+        # Consecutive statements may land on different server connections: no statement caches,
+        # and unique names for the statements asyncpg still prepares per query.
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        query["prepared_statement_cache_size"] = "0"
+    elif DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+# Async path for the request handlers; the import scripts and migrations keep the sync engine.
+_ASYNC_URL, _ASYNC_CONNECT_ARGS = _async_url(os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL)
+async_engine = create_async_engine(
+    _ASYNC_URL, poolclass=InstrumentedAsyncQueuePool, connect_args=_ASYNC_CONNECT_ARGS, **_pool_options()
+)
+if DB_PING_INTERVAL > 0:
+    install_ping(async_engine, DB_PING_INTERVAL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    """FastAPI dependency: an AsyncSession, committed after the handler returns, rolled back on error."""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
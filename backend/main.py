@@ -1,29 +1,47 @@
 from fastapi import FastAPI, Depends, HTTPException, Depends, Header, Query, Path, Request, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from datetime import datetime
 import random, string
+from functools import lru_cache
+import signal
 from typing import Optional
 import os
 import psycopg2
 from fastapi.responses import JSONResponse
 import boto3
-from google.oauth2 import service_account
-import gspread
 from fastapi.responses import JSONResponse
 import json
-from sqlalchemy import cast, Integer
+from sqlalchemy import bindparam, case, Integer, func, literal, null, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.models import (
-    Program,Service, Scholarship, LeadIn, LeadOut, Booking, BookingCreate, AustraliaScholarship, UniversityModel 
+    Program,Service, Scholarship, LeadIn, LeadOut, Booking, BookingCreate, BookingPage, ShortlistPreference, ShortlistItem, AustraliaScholarship, UniversityModel, ScholarshipModel, ProgramDetail
 )
-from db import Base, engine, get_db
+from db import AsyncSessionLocal, Base, async_engine, engine, get_async_db, get_db
 from models.models_user import User
+from models.models_contact import LeadRecord, BookingRecord, insert_many
 from models.schemas_user import UserRegister, UserLogin, UserVerify, UserOut, TokenResponse
-from utils.crud_user import get_user_by_email, create_user
-from utils.auth_utils import hash_password, verify_password, create_token, decode_token
-from utils.email_service import send_otp, smtp_diagnostics
+from utils.crud_user import (
+    create_user, get_user_by_email_async, update_password_hash_async, get_token_version_async, revoke_tokens_async,
+)
+from utils.australia_scholarships import australia_scholarships
+from utils.auth_utils import (
+    hash_password_async, verify_password_async, needs_rehash, shutdown_hash_executor, create_token, decode_token,
+)
+from utils.email_service import send_otp, smtp_diagnostics, mail_queue
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+from utils.cache import TTLCache
+from utils.db_pool import pool_metrics
+from utils.projection import InvalidFields, canonical_fields, parse_fields, project_dict, project_json, project_row
+from utils.raw_json import RawJSONResponse, fetch_json_async, json_array, json_object, json_text
+from utils.program_index import program_index, PROGRAM_INDEX_ENABLED
+from utils.response_cache import response_cache
+from utils.sheets_writer import sheets_writer
+from utils.shortlist import get_catalogue
+from utils.shortlist_features import get_scorer as get_shortlist_scorer
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -51,77 +69,137 @@ SCHOLARSHIPS = [
     Scholarship(id=3, name="EU Research Fellowship", country="Germany", amount="€12,000", level="PhD", deadline="2026-01-20"),
 ]
 
-LEADS: list[LeadOut] = []
-BOOKINGS: list[Booking] = [
-    Booking(id=1, topic="Peer Counselling", scheduled_for=datetime.utcnow()+timedelta(days=3), status="upcoming"),
-]
-
 Base.metadata.create_all(bind=engine)
 
 DB_URL = os.environ.get("DATABASE_URL")
 session = boto3.session.Session()
 
+
+@app.on_event("startup")
+def start_program_index():
+    if not PROGRAM_INDEX_ENABLED:
+        return
+    program_index.reload_async()
+    # `kill -HUP <pid>` after an import rebuilds the index without a restart.
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: program_index.reload_async())
+
+@app.on_event("startup")
+def load_australia_scholarships():
+    australia_scholarships.reload_async()
+
+@app.on_event("startup")
+def start_mail_queue():
+    mail_queue.start()
+
+@app.on_event("startup")
+def start_sheets_writer():
+    sheets_writer.start()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def stop_hash_executor():
+    shutdown_hash_executor()
+
+@app.on_event("shutdown")
+def stop_mail_queue():
+    mail_queue.stop()
+
+@app.on_event("shutdown")
+def stop_sheets_writer():
+    sheets_writer.stop()
+
 def generate_otp(length: int = 6) -> str:
     return "".join(random.choices(string.digits, k=length))
 
 @app.post("/auth/register", response_model=dict, tags=["auth"], summary="Register & send OTP")
-def register(payload: UserRegister, db_session=Depends(get_db)):
-    db: Session
-    with db_session as db:
-        existing = get_user_by_email(db, payload.email.lower())
-        if existing:
-            if existing.is_verified:
-                raise HTTPException(status_code=400, detail="Email already registered")
-            user = existing
-            user.full_name = payload.full_name
-            user.role = payload.role
-            user.password_hash = hash_password(payload.password)
-        else:
-            user = create_user(
-                db,
-                email=payload.email,
-                full_name=payload.full_name,
-                role=payload.role,
-                password_hash=hash_password(payload.password),
-            )
-        code = generate_otp()
-        user.set_otp(code)
-        if not send_otp(user.email, code):
-            raise HTTPException(status_code=500, detail="Could not send verification email (check SMTP settings)")
-        return {"message": "OTP sent to email for verification"}
+async def register(payload: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    existing = await get_user_by_email_async(db, payload.email.lower())
+    if existing and existing.is_verified:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    # bcrypt runs in the hashing process pool, and only once we know the hash will be stored.
+    password_hash = await hash_password_async(payload.password)
+    if existing:
+        user = existing
+        user.full_name = payload.full_name
+        user.role = payload.role
+        user.password_hash = password_hash
+    else:
+        user = create_user(
+            db,
+            email=payload.email,
+            full_name=payload.full_name,
+            role=payload.role,
+            password_hash=password_hash,
+        )
+    code = generate_otp()
+    user.set_otp(code)
+    # Queue the mail only once the OTP is committed; delivery happens in the background.
+    await db.commit()
+    # send_otp may refresh the SMTP pre-flight check (DNS lookup + TCP connect): keep it off the loop.
+    if not await run_in_threadpool(send_otp, user.email, code):
+        raise HTTPException(status_code=500, detail="Could not send verification email (check SMTP settings)")
+    return {"message": "OTP sent to email for verification"}
 
 @app.post("/auth/verify", response_model=TokenResponse, tags=["auth"], summary="Verify OTP & get token")
-def verify_otp(payload: UserVerify, db_session=Depends(get_db)):
-    db: Session
-    with db_session as db:
-        user = get_user_by_email(db, payload.email.lower())
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        if user.is_verified:
-            return TokenResponse(access_token=create_token(str(user.id)))
-        if not user.otp_code or not user.otp_expires:
-            raise HTTPException(status_code=400, detail="No OTP pending")
-        if datetime.utcnow() > user.otp_expires:
-            raise HTTPException(status_code=400, detail="OTP expired")
-        if payload.code != user.otp_code:
-            raise HTTPException(status_code=400, detail="Invalid OTP")
-        user.is_verified = True
-        user.otp_code = None
-        user.otp_expires = None
-        return TokenResponse(access_token=create_token(str(user.id)))
+async def verify_otp(payload: UserVerify, db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_by_email_async(db, payload.email.lower())
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.is_verified:
+        return TokenResponse(access_token=issue_token(user))
+    if not user.otp_code or not user.otp_expires:
+        raise HTTPException(status_code=400, detail="No OTP pending")
+    if datetime.utcnow() > user.otp_expires:
+        raise HTTPException(status_code=400, detail="OTP expired")
+    if payload.code != user.otp_code:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+    user.is_verified = True
+    user.otp_code = None
+    user.otp_expires = None
+    return TokenResponse(access_token=issue_token(user))
 
 @app.post("/auth/login", response_model=TokenResponse, tags=["auth"], summary="Login (requires verified)")
-def login(payload: UserLogin, db_session=Depends(get_db)):
-    db: Session
-    with db_session as db:
-        user = get_user_by_email(db, payload.email.lower())
-        if not user or not verify_password(payload.password, user.password_hash):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        if not user.is_verified:
-            raise HTTPException(status_code=403, detail="Email not verified")
-        return TokenResponse(access_token=create_token(str(user.id)))
-
-def auth_user(authorization: str | None = Header(default=None), db_session=Depends(get_db)) -> UserOut:
+async def login(payload: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_by_email_async(db, payload.email.lower())
+    if not user or not await verify_password_async(payload.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not user.is_verified:
+        raise HTTPException(status_code=403, detail="Email not verified")
+    if needs_rehash(user.password_hash):
+        # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the password.
+        new_hash = await hash_password_async(payload.password)
+        await update_password_hash_async(db, user.id, new_hash)
+    return TokenResponse(access_token=issue_token(user))
+
+# user id -> token_version, so steady-state authenticated requests skip the users table.
+# Revocations made by another process are picked up once the entry expires.
+TOKEN_VERSION_CACHE = TTLCache(maxsize=10000, ttl=float(os.getenv("AUTH_TOKEN_VERSION_TTL", "30")))
+
+def issue_token(user: User) -> str:
+    # Everything UserOut needs travels in the token; "ver" is checked against users.token_version.
+    return create_token(str(user.id), {
+        "email": user.email,
+        "name": user.full_name,
+        "role": user.role,
+        "verified": user.is_verified,
+        "created": user.created_at.isoformat(),
+        "ver": user.token_version or 0,
+    })
+
+async def _current_token_version(user_id: str) -> int | None:
+    version = TOKEN_VERSION_CACHE.get(user_id)
+    if version is None:
+        async with AsyncSessionLocal() as db:
+            version = await get_token_version_async(db, user_id)
+        if version is not None:
+            TOKEN_VERSION_CACHE.set(user_id, version)
+    return version
+
+async def auth_user(authorization: str | None = Header(default=None)) -> UserOut:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing token")
     token = authorization.split(" ",1)[1]
@@ -130,20 +208,30 @@ def auth_user(authorization: str | None = Header(default=None), db_session=Depen
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     user_id = data.get("sub")
-    db: Session
-    with db_session as db:
-        user = db.get(User, user_id)
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        payload = {
-            "id": str(user.id),
-            "email": user.email,
-            "full_name": user.full_name,
-            "role": user.role,
-            "is_verified": user.is_verified,
-            "created_at": user.created_at
-        }
-        return UserOut.model_validate(payload)
+    if "ver" not in data:
+        # Issued before tokens carried a version, so /auth/revoke can't reach it: log in again.
+        raise HTTPException(status_code=401, detail="Token expired, please log in again")
+    version = await _current_token_version(user_id)
+    if version is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if data["ver"] != version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    # Claims were signed by us, so skip re-validating them.
+    return UserOut.model_construct(
+        id=user_id,
+        email=data["email"],
+        full_name=data.get("name"),
+        role=data["role"],
+        is_verified=data["verified"],
+        created_at=datetime.fromisoformat(data["created"]),
+    )
+
+@app.post("/auth/revoke", tags=["auth"], summary="Sign out everywhere (revoke all tokens)")
+async def revoke(current: UserOut = Depends(auth_user), db: AsyncSession = Depends(get_async_db)):
+    version = await revoke_tokens_async(db, current.id)
+    await db.commit()
+    TOKEN_VERSION_CACHE.pop(current.id)
+    return {"message": "All tokens revoked", "token_version": version}
 
 @app.get("/users/me", response_model=UserOut, tags=["users"], summary="Current user")
 def me(current: UserOut = Depends(auth_user)):
@@ -172,32 +260,118 @@ def list_scholarships(country: Optional[str] = None, level: Optional[str] = None
         data = [s for s in data if s.level.lower() == level.lower()]
     return data
 
+@app.get("/api/australia-scholarships", tags=["scholarships"], summary="Australian universities and their scholarships")
+def list_australia_scholarships(
+    request: Request,
+    state: Optional[str] = Query(None, description="e.g. NSW"),
+    type: Optional[str] = Query(None, description="Public or Private"),
+    level: Optional[str] = Query(None, description="Scholarship level, e.g. UG, PG, PhD"),
+):
+    # Served from a preloaded, pre-encoded snapshot (utils/australia_scholarships.py).
+    return australia_scholarships.respond(request, state, type, level)
+
+
+BULK_INSERT_MAX = 1000
+
+@app.post("/shortlist", response_model=list[ShortlistItem], tags=["shortlist"], summary="Best-matching universities")
+def shortlist(
+    prefs: ShortlistPreference,
+    limit: int = Query(20, ge=1, le=100),
+    profile: Optional[str] = Query(None, description="Weight profile (balanced, budget, prestige, funding, ...) for feature-based ranking"),
+    db_session=Depends(get_db),
+):
+    with db_session as db:
+        catalogue = get_catalogue(db)
+    if profile is None:
+        return catalogue.shortlist(prefs, k=limit)
+    scorer = get_shortlist_scorer()
+    if scorer is None:
+        raise HTTPException(status_code=503, detail="Shortlist features not built (python -m utils.shortlist_features build)")
+    if profile not in scorer.profiles:
+        raise HTTPException(status_code=400, detail=f"Unknown profile; use one of {sorted(scorer.profiles)}")
+    return scorer.shortlist(catalogue, prefs, profile, k=limit)
 
 
 @app.post("/leads", response_model=LeadOut, status_code=201, tags=["leads"], summary="Create lead")
-def create_lead(payload: LeadIn):
-    lead = LeadOut(id=len(LEADS)+1, created_at=datetime.utcnow(), **payload.dict())
-    LEADS.append(lead)
-    return lead
+def create_lead(payload: LeadIn, db_session=Depends(get_db)):
+    with db_session as db:
+        row, = insert_many(db, LeadRecord, [payload.model_dump()])
+        return LeadOut.model_validate(row._mapping)
 
 
-@app.get("/bookings", response_model=list[Booking], tags=["bookings"], summary="List bookings (static demo)")
-def list_bookings():
-    return BOOKINGS
+@app.post("/leads/bulk", response_model=list[LeadOut], status_code=201, tags=["leads"], summary="Create leads in one insert")
+def create_leads_bulk(payload: list[LeadIn] = Body(..., max_length=BULK_INSERT_MAX), db_session=Depends(get_db)):
+    with db_session as db:
+        rows = insert_many(db, LeadRecord, [lead.model_dump() for lead in payload])
+        return [LeadOut.model_validate(row._mapping) for row in rows]
 
 
-@app.post("/bookings", response_model=Booking, status_code=201, tags=["bookings"], summary="Create booking (static in-memory)")
-def create_booking(payload: BookingCreate):
-    b = Booking(id=len(BOOKINGS)+1, topic=payload.topic, scheduled_for=payload.scheduled_for, status="upcoming")
-    BOOKINGS.append(b)
-    return b
+@app.get("/bookings", response_model=BookingPage, tags=["bookings"], summary="List bookings (newest first)")
+def list_bookings(
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    page_size: int = Query(50, ge=1, le=200),
+    db_session=Depends(get_db),
+):
+    with db_session as db:
+        query = db.query(BookingRecord)
+        if status:
+            query = query.filter(BookingRecord.status == status)
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+                created_at, booking_id = position["k"]
+                boundary = (datetime.fromisoformat(created_at), int(booking_id))
+            except (InvalidCursor, ValueError, TypeError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if position.get("s") != "created_at":
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.filter(tuple_(BookingRecord.created_at, BookingRecord.id) < tuple_(*map(literal, boundary)))
+        rows = query.order_by(BookingRecord.created_at.desc(), BookingRecord.id.desc()).limit(page_size + 1).all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor("created_at", [rows[-1].created_at.isoformat(), rows[-1].id]) if has_more else None
+        return {
+            "items": [Booking.model_validate(b, from_attributes=True) for b in rows],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+
+
+@app.post("/bookings", response_model=Booking, status_code=201, tags=["bookings"], summary="Create booking")
+def create_booking(payload: BookingCreate, db_session=Depends(get_db)):
+    with db_session as db:
+        row, = insert_many(db, BookingRecord, [{**payload.model_dump(), "status": "upcoming"}])
+        return Booking.model_validate(row._mapping)
+
+
+@app.post("/bookings/bulk", response_model=list[Booking], status_code=201, tags=["bookings"], summary="Create bookings in one insert")
+def create_bookings_bulk(payload: list[BookingCreate] = Body(..., max_length=BULK_INSERT_MAX), db_session=Depends(get_db)):
+    with db_session as db:
+        rows = insert_many(db, BookingRecord, [{**b.model_dump(), "status": "upcoming"} for b in payload])
+        return [Booking.model_validate(row._mapping) for row in rows]
 
 
 @app.get("/debug/smtp", tags=["meta"], summary="SMTP diagnostics (protected)")
 def smtp_debug(current: UserOut = Depends(auth_user)):
     if current.role != "counsellor":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return smtp_diagnostics()
+    return {**smtp_diagnostics(), "queue": mail_queue.stats()}
+
+
+@app.get("/debug/cache", tags=["meta"], summary="Response cache counters (protected)")
+def cache_debug(current: UserOut = Depends(auth_user)):
+    if current.role != "counsellor":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return response_cache.stats()
+
+
+@app.get("/debug/pool", tags=["meta"], summary="Database pool occupancy and checkout latency (protected)")
+def pool_debug(current: UserOut = Depends(auth_user)):
+    if current.role != "counsellor":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"sync": pool_metrics(engine), "async": pool_metrics(async_engine)}
 
 
 @app.post("/api/consultation-excel")
@@ -217,21 +391,8 @@ async def consultation_to_excel(request: Request):
             data.get("timestamp", "")
         ]
 
-        GOOGLE_SERVICE_ACCOUNT_FILE = os.environ.get("GOOGLE_SERVICE_ACCOUNT_FILE")
-        SPREADSHEET_ID = os.environ.get("EXCEL_FILE_ID")
-
-        creds = service_account.Credentials.from_service_account_file(
-            GOOGLE_SERVICE_ACCOUNT_FILE,
-            scopes=["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        )
-
-        gc = gspread.authorize(creds)
-
-        sh = gc.open_by_key(SPREADSHEET_ID)
-
-        worksheet = sh.sheet1
-
-        worksheet.append_row(row)
+        # Journaled locally and appended to the sheet in batches by a background thread.
+        sheets_writer.submit(row)
 
         return {"status": "ok", "message": "Consultation saved to Google Sheet"}
 
@@ -301,131 +462,517 @@ async def consultation_to_excel(request: Request):
 #     }
     
     
+# Response documents are built by Postgres and passed through as text (utils/raw_json).
+UNIVERSITY_JSON = select(json_text(json_object(
+    UniversityModel.id, UniversityModel.type, UniversityModel.attributes,
+    UniversityModel.relationships, UniversityModel.included,
+))).where(UniversityModel.id == bindparam("id"))
+
+PROGRAM_DETAILS_JSON = select(json_text(json_array(
+    json_object(
+        ProgramDetail.id,
+        type=null(),  # program_details has no type column; kept for the response shape
+        attributes=ProgramDetail.attributes,
+        school=ProgramDetail.school,
+        program=ProgramDetail.program,
+        program_requirements=ProgramDetail.program_requirements,
+    ),
+    order_by=ProgramDetail.id,
+))).where(ProgramDetail.school_id == bindparam("school_id"))
+
 @app.get("/universities/{school_id}")
-def get_university_by_school_id(
+async def get_university_by_school_id(
     school_id: str,
-    db_session=Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-   
-    db: Session
-    with db_session as db:
-        uni = db.query(UniversityModel).filter(UniversityModel.id == str(school_id)).first()
-        if not uni:
-            raise HTTPException(status_code=404, detail="University not found")
-        return {
-            "id": uni.id,
-            "type": uni.type,
-            "attributes": uni.attributes,
-            "relationships": uni.relationships,
-            "included": getattr(uni, "included", None)
-        }
+    cached = await response_cache.lookup_async(request, "universities", school_id)
+    if cached is not None:
+        return cached
+
+    payload = await fetch_json_async(db, UNIVERSITY_JSON, {"id": str(school_id)})
+    if payload is None:
+        raise HTTPException(status_code=404, detail="University not found")
+    return await response_cache.store_async(request, "universities", school_id, payload)
+
+FIXED_AMOUNT = "fixed_amount"
+SCHOLARSHIP_HEADLINE_OPTIONS = "MaxWords=35, MinWords=15, MaxFragments=2, StartSel=<mark>, StopSel=</mark>"
+
+# Declared before /scholarships/{school_id} so "search" isn't taken for a school id.
+@app.get("/scholarships/search", tags=["scholarships"], summary="Full-text scholarship search")
+async def search_scholarships(
+    q: Optional[str] = Query(None, description="Search words; supports \"quoted phrases\", OR and -exclusions"),
+    level: Optional[str] = Query(None, description="Exact eligibleLevels entry, e.g. \"Master's Degree\""),
+    nationality: Optional[str] = Query(None, description="Scholarships open to this nationality (or to all)"),
+    award_type: Optional[str] = Query(None, description="fixed_amount or percentage"),
+    min_award: Optional[float] = Query(None, ge=0, description="Smallest fixed award amount; implies fixed_amount"),
+    max_award: Optional[float] = Query(None, ge=0, description="Largest fixed award amount; implies fixed_amount"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    filters = []
+    query = func.websearch_to_tsquery("english", q) if q and q.strip() else None
+    if query is not None:
+        filters.append(ScholarshipModel.searchVector.op("@@")(query))
+    if level:
+        filters.append(ScholarshipModel.eligibleLevels.contains([level]))
+    if nationality:
+        # an empty list means no nationality restriction
+        filters.append(or_(
+            ScholarshipModel.eligibleNationalities.contains([nationality]),
+            ScholarshipModel.eligibleNationalities == literal([], JSONB),
+            ScholarshipModel.eligibleNationalities.is_(None),
+        ))
+    if award_type:
+        filters.append(ScholarshipModel.awardAmountType == award_type)
+    # awardAmountFrom of a percentage award is a percentage, not money
+    if min_award is not None or max_award is not None:
+        filters.append(ScholarshipModel.awardAmountType == FIXED_AMOUNT)
+    if min_award is not None:
+        filters.append(ScholarshipModel.awardAmountFrom >= min_award)
+    if max_award is not None:
+        filters.append(ScholarshipModel.awardAmountFrom <= max_award)
+
+    if query is not None:
+        rank = func.ts_rank_cd(ScholarshipModel.searchVector, query)
+        order = [rank.desc(), ScholarshipModel.id]
+    else:
+        rank = literal(None)
+        # largest fixed awards first; percentage and other awards follow
+        fixed_amount = case((ScholarshipModel.awardAmountType == FIXED_AMOUNT, ScholarshipModel.awardAmountFrom))
+        order = [fixed_amount.desc().nulls_last(), ScholarshipModel.id]
+
+    # Rank and page on ids first; headlines are only computed for the rows returned.
+    hits = (
+        select(ScholarshipModel.id, rank.label("rank"), func.row_number().over(order_by=order).label("pos"))
+        .where(*filters)
+        .order_by(*order)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+        .subquery()
+    )
+    columns = [
+        ScholarshipModel.id, ScholarshipModel.title, ScholarshipModel.awardAmountFrom, ScholarshipModel.awardAmountTo,
+        ScholarshipModel.awardAmountType, ScholarshipModel.awardAmountCurrencyCode, ScholarshipModel.eligibleLevels,
+        ScholarshipModel.schoolGroupId, ScholarshipModel.schoolGroupName, ScholarshipModel.sourceUrl, hits.c.rank,
+    ]
+    if query is not None:
+        columns += [
+            func.ts_headline("english", ScholarshipModel.title, query, "HighlightAll=true").label("title_highlight"),
+            func.ts_headline("english", ScholarshipModel.description, query, SCHOLARSHIP_HEADLINE_OPTIONS).label("headline"),
+        ]
+    stmt = select(*columns).join(hits, hits.c.id == ScholarshipModel.id).order_by(hits.c.pos)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    has_more = len(rows) > page_size
+    return {
+        "items": [dict(row) for row in rows[:page_size]],
+        "page": page,
+        "page_size": page_size,
+        "has_more": has_more,
+    }
+
+SCHOLARSHIPS_BY_SCHOOL = select(
+    ScholarshipModel.id, ScholarshipModel.title, ScholarshipModel.description,
+    ScholarshipModel.awardAmountFrom, ScholarshipModel.awardAmountTo, ScholarshipModel.awardAmountType,
+    ScholarshipModel.schoolGroupId, ScholarshipModel.schoolGroupName, ScholarshipModel.sourceUrl,
+    ScholarshipModel.updatedAt,
+).where(ScholarshipModel.schoolGroupId == bindparam("school_id"))
 
 @app.get("/scholarships/{school_id}")
-def get_scholarships_by_school_id(
+async def get_scholarships_by_school_id(
     school_id: str,
-    db_session=Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
+    cached = await response_cache.lookup_async(request, "scholarships", school_id)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(SCHOLARSHIPS_BY_SCHOOL, {"school_id": int(school_id)})).mappings()
+    payload = [dict(row) for row in rows]
+    return await response_cache.store_async(request, "scholarships", school_id, payload)
+
+# Default `fields=` of the program list endpoints: what the UniversitiesPage cards render.
+# `fields=*` returns whole documents.
+PROGRAM_CARD_ATTRIBUTES = (
+    "name", "programLevel", "level", "tuition", "currency", "applicationFee", "application_fee",
+    "minLength", "maxLength", "duration", "programIntakes",
+    "school.id", "school.name", "school.logoThumbnailUrl", "school.city", "school.province", "school.state",
+    "school.country", "school.countryCode",
+)
+PROGRAM_LIST_FIELDS = ",".join(["id", "type", *(f"attributes.{a}" for a in PROGRAM_CARD_ATTRIBUTES)])
+PROGRAM_DETAIL_LIST_FIELDS = ",".join(
+    ["id", "type", "school.id", "school.name", *(f"attributes.{a}" for a in PROGRAM_CARD_ATTRIBUTES)]
+)
 
-    db: Session
-    with db_session as db:
-        from models.models import ScholarshipModel
-        scholarships = db.query(ScholarshipModel).filter(ScholarshipModel.schoolGroupId == int(school_id)).all()
-        return [
-            {
-                "id": sch.id,
-                "title": sch.title,
-                "description": sch.description,
-                "awardAmountFrom": sch.awardAmountFrom,
-                "awardAmountTo": sch.awardAmountTo,
-                "awardAmountType": sch.awardAmountType,
-                "schoolGroupId": sch.schoolGroupId,
-                "schoolGroupName": sch.schoolGroupName,
-                "sourceUrl": sch.sourceUrl,
-                "updatedAt": sch.updatedAt,
-            }
-            for sch in scholarships
-        ]
+def _list_fields(fields: Optional[str], default: str) -> str:
+    """Canonical form of a list endpoint's `fields=`: `default` when absent, "" for everything."""
+    if fields is None:
+        fields = default
+    if fields.strip() == "*":
+        return ""
+    try:
+        return canonical_fields(parse_fields(fields))
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+PROGRAM_DETAIL_COLUMNS = {
+    "id": ProgramDetail.id,
+    "type": null(),
+    "attributes": ProgramDetail.attributes,
+    "school": ProgramDetail.school,
+    "program": ProgramDetail.program,
+    "program_requirements": ProgramDetail.program_requirements,
+}
+
+@lru_cache(maxsize=256)
+def _program_details_stmt(fields: str):
+    if not fields:
+        return PROGRAM_DETAILS_JSON
+    return select(json_text(json_array(
+        project_row(PROGRAM_DETAIL_COLUMNS, parse_fields(fields)), order_by=ProgramDetail.id,
+    ))).where(ProgramDetail.school_id == bindparam("school_id"))
 
 @app.get("/api/programs/by-school/{school_id}")
-def get_programs_by_school_id(
+async def get_programs_by_school_id(
     school_id: str,
-    db_session=Depends(get_db)
+    request: Request,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated paths, e.g. id,attributes.name,school.name; * for whole documents",
+    ),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db: Session
-    with db_session as db:
-        from models.models import ProgramDetail
-        programs = db.query(ProgramDetail).filter(ProgramDetail.school_id == str(school_id)).all()
-        return [
-            {
-                "id": prog.id,
-                "type": prog.type,
-                "attributes": prog.attributes,
-                "school": prog.school,
-                "program": prog.program,
-                "program_requirements": prog.program_requirements
-            }
-            for prog in programs
-        ]
+    canonical = _list_fields(fields, PROGRAM_DETAIL_LIST_FIELDS)
+    try:
+        stmt = _program_details_stmt(canonical)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        school_id_int = int(school_id)
+    except ValueError:
+        return []  # program_details.school_id is numeric: nothing can match
+    # Only the default projection is cached, so invalidating by school id covers it.
+    cacheable = fields is None
+    if cacheable:
+        cached = await response_cache.lookup_async(request, "program_details", school_id)
+        if cached is not None:
+            return cached
+
+    payload = await fetch_json_async(db, stmt, {"school_id": school_id_int})
+    if cacheable:
+        return await response_cache.store_async(request, "program_details", school_id, payload)
+    return RawJSONResponse(content=payload)
+
+# Columns of each section of /universities/{id}/full, keyed by their name in the response.
+UNIVERSITY_COLUMNS = {c.key: c for c in (
+    UniversityModel.id, UniversityModel.type, UniversityModel.attributes,
+    UniversityModel.relationships, UniversityModel.included,
+)}
+SCHOLARSHIP_COLUMNS = {c.key: c for c in SCHOLARSHIPS_BY_SCHOOL.selected_columns}
+UNIVERSITY_FULL_SECTIONS = ("university", "scholarships", "programs")
+
+@lru_cache(maxsize=256)
+def _university_full_stmt(fields: str, include: tuple):
+    """One statement (one round trip) that returns the whole document as JSON text."""
+    tree = parse_fields(fields) or {}
+    unknown = [name for name in tree if name not in UNIVERSITY_FULL_SECTIONS]
+    if unknown:
+        raise InvalidFields(f"Field paths must start with one of {', '.join(UNIVERSITY_FULL_SECTIONS)}")
+    # a section without any path in `fields` (or selected whole) comes back in full
+    section_tree = {name: tree.get(name) or None for name in UNIVERSITY_FULL_SECTIONS}
+
+    sections = {"university": project_row(UNIVERSITY_COLUMNS, section_tree["university"])}
+    if "scholarships" in include:
+        sections["scholarships"] = select(json_array(
+            project_row(SCHOLARSHIP_COLUMNS, section_tree["scholarships"]), order_by=ScholarshipModel.id,
+        )).where(ScholarshipModel.schoolGroupId == bindparam("school_group_id", type_=Integer)).scalar_subquery()
+    if "programs" in include:
+        sections["programs"] = select(json_array(
+            project_row(PROGRAM_DETAIL_COLUMNS, section_tree["programs"]), order_by=ProgramDetail.id,
+        )).where(ProgramDetail.school_id == bindparam("school_group_id", type_=Integer)).scalar_subquery()
+    return select(json_text(json_object(**sections))).where(UniversityModel.id == bindparam("id"))
+
+@app.get("/universities/{school_id}/full", tags=["universities"], summary="University with its scholarships and programs")
+async def get_university_full(
+    school_id: str,
+    request: Request,
+    include: str = Query("scholarships,programs", description="Sections to embed next to the university record"),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated paths, prefixed with the section, e.g. "
+                    "university.attributes.name,programs.attributes.name,scholarships.title",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    sections = tuple(s for s in UNIVERSITY_FULL_SECTIONS[1:] if s in {p.strip() for p in include.split(",")})
+    try:
+        canonical = canonical_fields(parse_fields(fields))
+        stmt = _university_full_stmt(canonical, sections)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Only the default document is cached: invalidating it by school id is enough to
+    # keep it in step with the university, scholarship and program imports.
+    cacheable = not canonical and sections == UNIVERSITY_FULL_SECTIONS[1:]
+    if cacheable:
+        cached = await response_cache.lookup_async(request, "universities_full", school_id)
+        if cached is not None:
+            return cached
+
+    try:
+        school_group_id = int(school_id)
+    except ValueError:
+        school_group_id = None  # not a numeric school: no scholarships or programs can match
+    payload = await fetch_json_async(db, stmt, {"id": school_id, "school_group_id": school_group_id})
+    if payload is None:
+        raise HTTPException(status_code=404, detail="University not found")
+    if cacheable:
+        return await response_cache.store_async(request, "universities_full", school_id, payload)
+    return RawJSONResponse(content=payload)
+
+# Sort keys usable by /api/programs/filter; Program.id is always appended as the
+# tie-breaker so keyset cursors point at exactly one row.
+PROGRAM_SORT_KEYS = {
+    "id": None,
+    "name": func.coalesce(Program.attributes["name"].astext, ""),
+    "school_name": func.coalesce(Program.school_name, ""),
+}
+PROGRAM_LIST_COLUMNS = {"id": Program.id, "type": Program.type, "attributes": Program.attributes}
+
+# Statements for /api/programs/filter are built once per shape (which filters are present,
+# sort key, paging mode) and then only get parameters bound, so requests skip statement
+# construction and always hit SQLAlchemy's compiled cache and asyncpg's prepared statements.
+# `shape` is (school_name, country, min_fees, max_fees) as booleans.
+
+def _program_filters(shape: tuple) -> list:
+    has_school, has_country, has_min, has_max = shape
+    filters = []
+    # Typed columns maintained by Program.upsert (trigram / btree indexed, see
+    # migrations.m002_programs_typed_columns).
+    if has_school:
+        filters.append(Program.school_name.ilike(bindparam("school_name")))
+    if has_country:
+        filters.append(Program.country.ilike(bindparam("country")))
+    if has_min:
+        filters.append(Program.tuition >= bindparam("min_fees"))
+    if has_max:
+        filters.append(Program.tuition <= bindparam("max_fees"))
+    return filters
+
+@lru_cache(maxsize=256)
+def _program_list_columns(fields: str) -> tuple:
+    """Item columns for a canonical `fields=` ("" for all); JSONB paths are projected in Postgres."""
+    tree = parse_fields(fields)
+    if tree is None:
+        return tuple(c.label(name) for name, c in PROGRAM_LIST_COLUMNS.items())
+    unknown = [name for name in tree if name not in PROGRAM_LIST_COLUMNS]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    columns = []
+    for name, column in PROGRAM_LIST_COLUMNS.items():
+        if name == "id" or name in tree:
+            sub = tree.get(name)
+            if sub and name != "attributes":
+                raise InvalidFields(f"{name!r} is not a JSON field, it can only be selected whole")
+            columns.append((project_json(column, sub) if sub else column).label(name))
+    return tuple(columns)
+
+def _program_items(rows, fields: str) -> list[dict]:
+    width = len(_program_list_columns(fields))
+    return [dict(zip(row._fields[:width], row[:width])) for row in rows]
+
+def _program_sort_cols(sort: str) -> list:
+    sort_expr = PROGRAM_SORT_KEYS[sort]
+    return [Program.id] if sort_expr is None else [sort_expr, Program.id]
+
+@lru_cache(maxsize=None)
+def _program_count_stmt(shape: tuple):
+    return select(func.count()).select_from(Program).where(*_program_filters(shape))
+
+@lru_cache(maxsize=1024)
+def _program_offset_stmt(shape: tuple, sort: str, fields: str):
+    return (
+        select(*_program_list_columns(fields))
+        .where(*_program_filters(shape))
+        .order_by(*_program_sort_cols(sort))
+        .offset(bindparam("offset", type_=Integer))
+        .limit(bindparam("limit", type_=Integer))
+    )
+
+@lru_cache(maxsize=1024)
+def _program_keyset_stmt(shape: tuple, sort: str, direction: Optional[str], fields: str):
+    """direction None: first page; "next"/"prev": rows after/before the k0, k1.. boundary."""
+    sort_cols = _program_sort_cols(sort)
+    stmt = select(*_program_list_columns(fields), *[c.label(f"sort_{i}") for i, c in enumerate(sort_cols)])
+    stmt = stmt.where(*_program_filters(shape))
+    if direction is not None:
+        key = tuple_(*sort_cols)
+        boundary = tuple_(*[bindparam(f"k{i}", type_=c.type) for i, c in enumerate(sort_cols)])
+        stmt = stmt.where(key > boundary if direction == "next" else key < boundary)
+    order = sort_cols if direction != "prev" else [c.desc() for c in sort_cols]
+    return stmt.order_by(*order).limit(bindparam("limit", type_=Integer))
+
+
+async def _keyset_page(
+    db: AsyncSession, shape: tuple, params: dict, sort: str, cursor: str, page_size: int, fields: str,
+) -> dict:
+    sort_cols = _program_sort_cols(sort)
+    params = {**params, "limit": page_size + 1}
+
+    direction = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if position.get("s") != sort or len(position["k"]) != len(sort_cols):
+            raise HTTPException(status_code=400, detail="Cursor does not match sort key")
+        direction = position["d"]
+        params.update({f"k{i}": v for i, v in enumerate(position["k"])})
+
+    rows = (await db.execute(_program_keyset_stmt(shape, sort, direction, fields), params)).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == "prev":
+        rows.reverse()
+    keys = [list(row[len(_program_list_columns(fields)):]) for row in rows]
+    direction = direction or "next"
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or direction == "prev":
+            next_cursor = encode_cursor(sort, keys[-1], "next")
+        if (has_more and direction == "prev") or (cursor and direction == "next"):
+            prev_cursor = encode_cursor(sort, keys[0], "prev")
+
+    return {
+        "items": _program_items(rows, fields),
+        "page_size": page_size,
+        "sort": sort,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "has_more": next_cursor is not None,
+    }
+
+
+# Totals for total_mode=estimated, keyed by the normalized filter set.
+PROGRAM_COUNT_CACHE = TTLCache(maxsize=2048, ttl=float(os.getenv("PROGRAM_COUNT_TTL", "300")))
+
+
+async def _estimated_program_total(db: AsyncSession, count_stmt, params: dict, filter_key: tuple) -> int:
+    total = PROGRAM_COUNT_CACHE.get(filter_key)
+    if total is not None:
+        return total
+    total = -1
+    if not any(v is not None for v in filter_key):
+        # Unfiltered listing: planner statistics are good enough and free.
+        total = (await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'programs'::regclass")
+        )).scalar() or -1
+    if total < 0:
+        # Table never analyzed, or filtered: count once and reuse it for the TTL.
+        total = (await db.execute(count_stmt, params)).scalar()
+    PROGRAM_COUNT_CACHE.set(filter_key, total)
+    return total
+
 
 @app.get("/api/programs/filter")
-def filter_programs(
+async def filter_programs(
     school_name: str = Query(None, description="School/University name (partial match)"),
     country: str = Query(None, description="Country (partial match)"),
     min_fees: int = Query(None, description="Minimum tuition fee"),
     max_fees: int = Query(None, description="Maximum tuition fee"),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
-    db_session=Depends(get_db),
+    cursor: str = Query(None, description="Keyset cursor from next_cursor/prev_cursor; pass an empty value to start cursor paging"),
+    sort: str = Query("id", description="Sort key: id, name or school_name"),
+    total_mode: str = Query("exact", description="exact: COUNT(*); estimated: planner stats / cached count; none: only has_more"),
+    fields: str = Query(None, description="Comma-separated paths, e.g. id,attributes.name,attributes.school.name; * for whole documents"),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    if sort not in PROGRAM_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+    if total_mode not in ("exact", "estimated", "none"):
+        raise HTTPException(status_code=400, detail=f"Unknown total_mode: {total_mode}")
+    fields = _list_fields(fields, PROGRAM_LIST_FIELDS)
     try:
-        with db_session as db:
-            query = db.query(Program)
-
-            # Filter by school/university name
-            if school_name:
-                query = query.filter(
-                    Program.attributes["school"]["name"].astext.ilike(f"%{school_name}%")
-                )
-
-            # Filter by country
-            if country:
-                query = query.filter(
-                    Program.attributes["school"]["country"].astext.ilike(f"%{country}%")
-                )
-
-            # Filter by tuition fees (assumes tuition is stored as integer in attributes['tuition'])
-            if min_fees is not None:
-                query = query.filter(
-                    cast(Program.attributes["tuition"].astext, Integer) >= min_fees
-                )
-            if max_fees is not None:
-                query = query.filter(
-                    cast(Program.attributes["tuition"].astext, Integer) <= max_fees
-                )
-
-            total = query.count()
-            offset = (page - 1) * page_size
-            results = query.offset(offset).limit(page_size).all()
-
-            items = [
-                {
-                    "id": prog.id,
-                    "type": prog.type,
-                    "attributes": prog.attributes,
-                }
-                for prog in results
-            ]
-
-            return {
-                "items": items,
-                "total": total,
-                "page": page,
-                "page_size": page_size,
-                "total_pages": (total + page_size - 1) // page_size,
-            }
+        _program_list_columns(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # In-memory index (PROGRAM_INDEX=1) serves offset paging with exact totals and facets.
+    if cursor is None and program_index.ready:
+        result = program_index.query(
+            school_name=school_name,
+            country=country,
+            min_fees=min_fees,
+            max_fees=max_fees,
+            sort=sort,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+        )
+        tree = parse_fields(fields)
+        if tree is not None:
+            result["items"] = [project_dict(item, {"id": {}, **tree}) for item in result["items"]]
+        total = result["total"]
+        result.update(
+            page=page,
+            page_size=page_size,
+            has_more=page * page_size < total,
+            total_pages=(total + page_size - 1) // page_size,
+        )
+        return result
+    try:
+        shape = (bool(school_name), bool(country), min_fees is not None, max_fees is not None)
+        params = {
+            "school_name": f"%{school_name}%" if school_name else None,
+            "country": f"%{country}%" if country else None,
+            "min_fees": min_fees,
+            "max_fees": max_fees,
+        }
+
+        count_stmt = _program_count_stmt(shape)
+        if total_mode == "exact":
+            total = (await db.execute(count_stmt, params)).scalar()
+        elif total_mode == "estimated":
+            filter_key = (
+                school_name.lower() if school_name else None,
+                country.lower() if country else None,
+                min_fees,
+                max_fees,
+            )
+            total = await _estimated_program_total(db, count_stmt, params, filter_key)
+        else:
+            total = None
+        totals = {
+            "total": total,
+            "total_pages": None if total is None else (total + page_size - 1) // page_size,
+        }
+        if total_mode == "estimated":
+            totals["total_is_estimate"] = True
+
+        # Cursor mode seeks straight to the boundary row instead of
+        # scanning and discarding `offset` rows.
+        if cursor is not None:
+            result = await _keyset_page(db, shape, params, sort, cursor, page_size, fields)
+            result.update(totals)
+            return result
+
+        # One extra row tells us whether another page exists without a COUNT.
+        rows = (await db.execute(
+            _program_offset_stmt(shape, sort, fields), {**params, "offset": (page - 1) * page_size, "limit": page_size + 1}
+        )).all()
+        has_more = len(rows) > page_size
+
+        return {
+            "items": _program_items(rows[:page_size], fields),
+            "page": page,
+            "page_size": page_size,
+            "has_more": has_more,
+            **totals,
+        }
     except SQLAlchemyError as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
-    finally:
-        # If we opened a context manager, close it
-        if hasattr(db_session, "__exit__"):
-            db_session.__exit__(None, None, None)
@@ -0,0 +1,217 @@
+"""
+Idempotent schema changes for tables that are not created by `Base.metadata.create_all`
+(programs, universities, scholarships, ... are loaded by the import scripts), and for
+columns added to tables that already exist (create_all never alters a table).
+
+Run with:  python migrations.py
+Applied migrations are recorded in the `schema_migrations` table, so re-running is safe.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from db import engine
+from models.models import SCHOLARSHIP_SEARCH_VECTOR_SQL
+
+
+def m001_programs_sort_indexes(conn: Connection):
+    # Backing indexes for keyset pagination on /api/programs/filter (sort=name / school_name).
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_programs_name_id
+        ON programs ((COALESCE(attributes ->> 'name', '')), id)
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_programs_school_name_id
+        ON programs ((COALESCE(attributes -> 'school' ->> 'name', '')), id)
+    """))
+
+
+def m002_programs_typed_columns(conn: Connection):
+    # Typed copies of attributes.school.{id,name,country} and attributes.tuition (see Program.typed_columns).
+    # Plain columns rather than GENERATED ones: a generated CAST would reject rows whose tuition isn't numeric.
+    conn.execute(text("""
+        ALTER TABLE programs
+            ADD COLUMN IF NOT EXISTS school_id INTEGER,
+            ADD COLUMN IF NOT EXISTS school_name TEXT,
+            ADD COLUMN IF NOT EXISTS country TEXT,
+            ADD COLUMN IF NOT EXISTS tuition INTEGER
+    """))
+    conn.execute(text(r"""
+        UPDATE programs SET
+            school_id = CASE WHEN attributes -> 'school' ->> 'id' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                             THEN round((attributes -> 'school' ->> 'id')::numeric)::int END,
+            school_name = attributes -> 'school' ->> 'name',
+            country = attributes -> 'school' ->> 'country',
+            tuition = CASE WHEN attributes ->> 'tuition' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                           THEN round((attributes ->> 'tuition')::numeric)::int END
+    """))
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_programs_school_id ON programs (school_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_programs_tuition ON programs (tuition)"))
+    # Trigram indexes serve the ILIKE '%...%' filters.
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_programs_school_name_trgm ON programs USING gin (school_name gin_trgm_ops)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_programs_country_trgm ON programs USING gin (country gin_trgm_ops)"))
+    # sort=school_name now orders by the column; replace the JSON expression index from m001.
+    conn.execute(text("DROP INDEX IF EXISTS ix_programs_school_name_id"))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_programs_school_name_col_id
+        ON programs ((COALESCE(school_name, '')), id)
+    """))
+    conn.execute(text("ANALYZE programs"))
+
+
+def m003_users_token_version(conn: Connection):
+    # Bumped to revoke every token issued to a user (see auth_user in main.py).
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _award_numeric_sql(column: str) -> str:
+    # ::text so this also works once m005 has made the column numeric
+    return rf"""CASE WHEN "{column}"::text ~ '^\s*\d+(\.\d+)?\s*$' THEN "{column}"::text::numeric END"""
+
+
+def m004_scholarships_search(conn: Connection):
+    # Generated columns + indexes behind /scholarships/search (see ScholarshipModel).
+    conn.execute(text(f"""
+        ALTER TABLE scholarships
+            ADD COLUMN IF NOT EXISTS "awardAmountFromNumeric" NUMERIC
+                GENERATED ALWAYS AS ({_award_numeric_sql("awardAmountFrom")}) STORED,
+            ADD COLUMN IF NOT EXISTS "awardAmountToNumeric" NUMERIC
+                GENERATED ALWAYS AS ({_award_numeric_sql("awardAmountTo")}) STORED,
+            ADD COLUMN IF NOT EXISTS "searchVector" TSVECTOR
+                GENERATED ALWAYS AS ({SCHOLARSHIP_SEARCH_VECTOR_SQL}) STORED
+    """))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_scholarships_search ON scholarships USING gin ("searchVector")'))
+    # jsonb_path_ops: smaller index, supports the @> containment filters
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_scholarships_levels
+        ON scholarships USING gin ("eligibleLevels" jsonb_path_ops)
+    """))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_scholarships_nationalities
+        ON scholarships USING gin ("eligibleNationalities" jsonb_path_ops)
+    """))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_scholarships_award_from ON scholarships ("awardAmountFromNumeric")'))
+    conn.execute(text("ANALYZE scholarships"))
+
+
+SCHOLARSHIP_BACKFILL_BATCH = 5000
+
+
+def _column_type(conn: Connection, table: str, column: str) -> str:
+    return conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c
+    """), {"t": table, "c": column}).scalar()
+
+
+def m005_scholarships_typed_columns(conn: Connection):
+    # awardAmountFrom/awardAmountTo text -> numeric, updatedAt text -> timestamptz.
+    # New columns are backfilled in committed id-range batches (short row locks, no table
+    # rewrite), then swapped in under a brief exclusive lock that also catches up rows
+    # inserted or updated meanwhile. Re-running after a failure is safe.
+    conversions = {
+        "awardAmountFrom": ("numeric", "pg_temp.try_numeric"),
+        "awardAmountTo": ("numeric", "pg_temp.try_numeric"),
+        "updatedAt": ("timestamp with time zone", "pg_temp.try_timestamptz"),
+    }
+    pending = {c: v for c, v in conversions.items() if _column_type(conn, "scholarships", c) != v[0]}
+
+    # Unparseable values become NULL instead of failing the migration.
+    conn.execute(text(r"""
+        CREATE OR REPLACE FUNCTION pg_temp.try_numeric(v text) RETURNS numeric AS $$
+            SELECT CASE WHEN v ~ '^\s*\d+(\.\d+)?\s*$' THEN v::numeric END
+        $$ LANGUAGE sql IMMUTABLE
+    """))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION pg_temp.try_timestamptz(v text) RETURNS timestamptz AS $$
+        BEGIN
+            RETURN v::timestamptz;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+
+    if pending:
+        conn.execute(text("ALTER TABLE scholarships " + ", ".join(
+            f'ADD COLUMN IF NOT EXISTS "{c}_typed" {t}' for c, (t, _) in pending.items()
+        )))
+        conn.commit()
+
+        assignments = ", ".join(f'"{c}_typed" = {fn}("{c}")' for c, (_, fn) in pending.items())
+        low, high = conn.execute(text("SELECT min(id), max(id) FROM scholarships")).one()
+        start = low
+        while start is not None and start <= high:
+            conn.execute(text(f"""
+                UPDATE scholarships SET {assignments}
+                WHERE id >= :start AND id < :end
+            """), {"start": start, "end": start + SCHOLARSHIP_BACKFILL_BATCH})
+            conn.commit()
+            start += SCHOLARSHIP_BACKFILL_BATCH
+            print(f"  backfilled scholarships up to id {min(start - 1, high)}")
+
+        conn.execute(text("LOCK TABLE scholarships IN ACCESS EXCLUSIVE MODE"))
+        # Recompute rather than only fill NULLs: rows an import updated after their batch
+        # was backfilled hold stale typed values.
+        catch_up = " OR ".join(f'"{c}_typed" IS DISTINCT FROM {fn}("{c}")' for c, (_, fn) in pending.items())
+        conn.execute(text(f"UPDATE scholarships SET {assignments} WHERE {catch_up}"))
+        # The m004 shadow columns depend on the old awardAmount* columns.
+        conn.execute(text("""
+            ALTER TABLE scholarships
+                DROP COLUMN IF EXISTS "awardAmountFromNumeric",
+                DROP COLUMN IF EXISTS "awardAmountToNumeric"
+        """))
+        for c in pending:
+            conn.execute(text(f'ALTER TABLE scholarships DROP COLUMN "{c}"'))
+            conn.execute(text(f'ALTER TABLE scholarships RENAME COLUMN "{c}_typed" TO "{c}"'))
+    else:
+        conn.execute(text("""
+            ALTER TABLE scholarships
+                DROP COLUMN IF EXISTS "awardAmountFromNumeric",
+                DROP COLUMN IF EXISTS "awardAmountToNumeric"
+        """))
+
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_scholarships_school_group ON scholarships ("schoolGroupId")'))
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_scholarships_award_type_from
+        ON scholarships ("awardAmountType", "awardAmountFrom")
+    """))
+    # replaces the m004 index dropped with "awardAmountFromNumeric" (search ordering, range filters)
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_scholarships_award_from ON scholarships ("awardAmountFrom")'))
+    conn.execute(text("ANALYZE scholarships"))
+
+
+MIGRATIONS = [
+    m001_programs_sort_indexes,
+    m002_programs_typed_columns,
+    m003_users_token_version,
+    m004_scholarships_search,
+    m005_scholarships_typed_columns,
+]
+
+
+def run_migrations():
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+    for migration in MIGRATIONS:
+        name = migration.__name__
+        if name in applied:
+            continue
+        print(f"Applying {name} ...")
+        # One transaction per migration, unless it commits batches itself (conn.commit()).
+        with engine.connect() as conn:
+            migration(conn)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+            conn.commit()
+    print("Migrations complete.")
+
+
+if __name__ == "__main__":
+    run_migrations()
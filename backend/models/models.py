@@ -1,22 +1,39 @@
-from itertools import count
+from itertools import count, islice
 import json
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import List, Optional, Any
-from sqlalchemy import JSON, Column, Integer, String, text
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import declarative_base, Session
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Callable, Iterable, List, Optional, Any
+from sqlalchemy import JSON, Column, Computed, DateTime, Integer, Numeric, String, event, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, insert as pg_insert
+from sqlalchemy.orm import declarative_base, deferred, Session
 import boto3
 import os
 from sqlalchemy.ext.mutable import MutableDict
 import re
-import mimetypes
-from urllib.parse import urlparse, unquote
-import requests
+
+from utils.response_cache import response_cache
+from utils.r2_store import store_url_in_r2
 
 Base = declarative_base()
 
 
+def _invalidate_after_commit(db: Session, namespace: str, key):
+    """
+    Drop a cached response once `db` commits. Invalidating before the commit would let a
+    request in between re-read the old row and cache it again until the TTL.
+    """
+    pending = db.info.setdefault("response_cache_invalidations", set())
+    if not pending:
+        event.listen(db, "after_commit", _run_invalidations, once=True)
+    pending.add((namespace, key))
+
+
+def _run_invalidations(db: Session):
+    for namespace, key in db.info.pop("response_cache_invalidations", ()):
+        response_cache.invalidate(namespace, key)
+
+
 class AustraliaScholarship(Base):
     __tablename__ = "australia_scholarships"
     __table_args__ = {'extend_existing': True}  # Ensures CREATE TABLE IF NOT EXISTS behavior
@@ -28,6 +45,20 @@ class AustraliaScholarship(Base):
     common_programs = Column(JSONB)
     updated_at = Column(String)
 
+    _upsert_key = "university"
+    _cache_key = None
+
+    @classmethod
+    def row_from_entry(cls, entry: dict) -> dict:
+        return {
+            "university": entry["university"],
+            "state": entry.get("state"),
+            "type": entry.get("type"),
+            "scholarships": entry.get("scholarships", []),
+            "common_programs": entry.get("common_programs", []),
+            "updated_at": entry.get("updated_at"),
+        }
+
 
 class Service(BaseModel):
     code: str
@@ -63,7 +94,7 @@ class ShortlistItem(BaseModel):
     university: str
     country: str
     match_score: float
-    tuition: int
+    tuition: Optional[int]
     programs: List[str]
 
 
@@ -90,6 +121,13 @@ class BookingCreate(BaseModel):
     scheduled_for: datetime
 
 
+class BookingPage(BaseModel):
+    items: List[Booking]
+    page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
 class ProgramDetail(Base):
     __tablename__ = "program_details"
     id = Column(String, primary_key=True)
@@ -99,6 +137,20 @@ class ProgramDetail(Base):
     program_requirements = Column(JSONB)
     school_id = Column(Integer)
 
+    # (response cache namespace, column holding its key), used by bulk_upsert
+    _cache_key = ("program_details", "school_id")
+
+    @classmethod
+    def row_from_entry(cls, entry: dict) -> dict:
+        return {
+            "id": entry['id'],
+            "attributes": entry.get('attributes'),
+            "school": entry.get('school'),
+            "program": entry.get('program'),
+            "program_requirements": entry.get('program_requirements'),
+            "school_id": entry.get('school_id'),
+        }
+
     @classmethod
     def upsert(cls, db: Session, entry: dict):
         obj = db.query(cls).get(entry['id'])
@@ -119,6 +171,7 @@ class ProgramDetail(Base):
             )
             db.add(obj)
         db.flush()
+        _invalidate_after_commit(db, "program_details", entry.get('school_id'))
         return obj
 
     @classmethod
@@ -126,10 +179,30 @@ class ProgramDetail(Base):
         return db.query(cls).filter_by(id=id_).first()
 
 
-def create_program_details_table_and_upload(db: Session, data: list[dict]):
-    for entry in data:
-        ProgramDetail.upsert(db, entry)
-        db.commit()
+def create_program_details_table_and_upload(db: Session, data: Iterable[dict], chunk_size: int = 500):
+    bulk_upsert(
+        db, ProgramDetail, data, chunk_size=chunk_size,
+        progress=lambda n: print(f"  {n} program details upserted"),
+    )
+
+
+_INT_RE = re.compile(r"^\s*-?\d+(\.\d+)?\s*$")
+
+
+def _to_int(value) -> Optional[int]:
+    """Lenient int parse for JSON values ("12000", 12000.0, ...); None if not numeric.
+    Mirrors the backfill expression in migrations.m002_programs_typed_columns."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) or (isinstance(value, str) and _INT_RE.match(value)):
+        # Postgres round(numeric) rounds half away from zero; Python's round() rounds half to even.
+        try:
+            return int(Decimal(str(value).strip()).quantize(0, ROUND_HALF_UP))
+        except (InvalidOperation, ValueError):  # inf / nan
+            return None
+    return None
 
 
 class Program(Base):
@@ -137,22 +210,44 @@ class Program(Base):
     id = Column(String, primary_key=True)
     type = Column(String)
     attributes = Column(JSONB)
+    # Typed copies of the hot filter fields in `attributes`, kept in sync by upsert
+    # so /api/programs/filter can use btree/trigram indexes instead of JSON extraction.
+    school_id = Column(Integer, index=True)
+    school_name = Column(String)
+    country = Column(String)
+    tuition = Column(Integer, index=True)
+
+    @classmethod
+    def row_from_entry(cls, entry: dict) -> dict:
+        attributes = entry.get('attributes', {})
+        return {"id": entry['id'], "type": entry.get('type'), "attributes": attributes, **cls.typed_columns(attributes)}
+
+    @staticmethod
+    def typed_columns(attributes: Optional[dict]) -> dict:
+        school = (attributes or {}).get('school') or {}
+        return {
+            "school_id": _to_int(school.get('id')),
+            "school_name": school.get('name'),
+            "country": school.get('country'),
+            "tuition": _to_int((attributes or {}).get('tuition')),
+        }
 
     @classmethod
     def upsert(cls, db: Session, entry: dict):
-        # Fetch school_id from attributes['school']['id'] if available
         attributes = entry.get('attributes', {})
-        school = attributes.get('school', {})
-        school_id = school.get('id')
+        typed = cls.typed_columns(attributes)
         obj = db.query(cls).get(entry['id'])
         if obj:
             obj.type = entry.get('type')
             obj.attributes = attributes
+            for field, value in typed.items():
+                setattr(obj, field, value)
         else:
             obj = cls(
                 id=entry['id'],
                 type=entry.get('type'),
                 attributes=attributes,
+                **typed,
             )
             db.add(obj)
         db.flush()
@@ -171,6 +266,18 @@ class UniversityModel(Base):
     relationships = Column(JSONB)
     included = Column(JSONB)
 
+    _cache_key = ("universities", "id")
+
+    @classmethod
+    def row_from_entry(cls, entry: dict) -> dict:
+        return {
+            "id": entry['id'],
+            "type": entry.get('type'),
+            "attributes": entry.get('attributes'),
+            "relationships": entry.get('relationships'),
+            "included": entry.get('included'),
+        }
+
     @classmethod
     def upsert(cls, db: Session, entry: dict):
         obj = db.query(cls).get(entry['id'])
@@ -188,9 +295,36 @@ class UniversityModel(Base):
                 included=entry.get('included')
             )
             db.add(obj)
+        _invalidate_after_commit(db, "universities", entry['id'])
         return obj
 
 
+def _to_decimal(value) -> Optional[Decimal]:
+    """"3000.0" / 3000 -> Decimal; None if not a plain non-negative number (same rule as migration m005)."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return Decimal(str(value)) if value >= 0 else None
+    if isinstance(value, str) and re.fullmatch(r"\s*\d+(\.\d+)?\s*", value):
+        return Decimal(value.strip())
+    return None
+
+
+def _to_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+SCHOLARSHIP_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', COALESCE(title, '')), 'A') || "
+    "setweight(to_tsvector('english', COALESCE(description, '')), 'B')"
+)
+
+
 class ScholarshipModel(Base):
     __tablename__ = "scholarships"
     id = Column(Integer, primary_key=True)
@@ -199,8 +333,8 @@ class ScholarshipModel(Base):
     description = Column(String)
     awardAmountCurrencyCode = Column(String)
     awardAmountCurrencySymbol = Column(String)
-    awardAmountFrom = Column(String)
-    awardAmountTo = Column(String)
+    awardAmountFrom = Column(Numeric)
+    awardAmountTo = Column(Numeric)
     awardAmountType = Column(String)
     automaticallyApplied = Column(String)
     eligibleLevels = Column(JSONB)
@@ -211,11 +345,28 @@ class ScholarshipModel(Base):
     schoolGroupName = Column(String)
     slug = Column(String)
     sourceUrl = Column(String)
-    updatedAt = Column(String)
+    updatedAt = Column(DateTime(timezone=True))
+    # Generated by Postgres (migration m004) for /scholarships/search; never written by us.
+    searchVector = deferred(Column(TSVECTOR, Computed(SCHOLARSHIP_SEARCH_VECTOR_SQL, persisted=True)))
+
+    _cache_key = ("scholarships", "schoolGroupId")
+
+    @classmethod
+    def writable_columns(cls) -> list[str]:
+        return [c.name for c in cls.__table__.columns if c.computed is None]
+
+    @classmethod
+    def row_from_entry(cls, entry: dict) -> dict:
+        row = {k: entry.get(k) for k in cls.writable_columns()}
+        # The source JSON has amounts as strings ("3000.0") and updatedAt as ISO-8601 text.
+        row["awardAmountFrom"] = _to_decimal(row["awardAmountFrom"])
+        row["awardAmountTo"] = _to_decimal(row["awardAmountTo"])
+        row["updatedAt"] = _to_datetime(row["updatedAt"])
+        return row
 
     @classmethod
     def upsert(cls, db: Session, entry: dict):
-        valid_fields = {k: entry.get(k) for k in cls.__table__.columns.keys()}
+        valid_fields = cls.row_from_entry(entry)
         obj = db.query(cls).get(valid_fields['id'])
         if obj:
             for field, value in valid_fields.items():
@@ -223,9 +374,52 @@ class ScholarshipModel(Base):
         else:
             obj = cls(**valid_fields)
             db.add(obj)
+        _invalidate_after_commit(db, "scholarships", valid_fields['schoolGroupId'])
         return obj
 
 
+def bulk_upsert(
+    db: Session,
+    model,
+    entries: Iterable[dict],
+    chunk_size: int = 500,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Batched alternative to calling `model.upsert` per row: each chunk of `chunk_size`
+    entries is written with one INSERT ... ON CONFLICT (id) DO UPDATE and committed as
+    one transaction. `progress(n)` is called after every chunk with the rows done so far.
+    Conflicts are resolved on `model._upsert_key` (the primary key "id" by default).
+    Returns the number of entries processed.
+    """
+    table = model.__table__
+    key = getattr(model, "_upsert_key", "id")
+    cache_key = getattr(model, "_cache_key", None)
+    done = 0
+    it = iter(entries)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            break
+        # Last entry wins when a chunk repeats a key (ON CONFLICT can't touch a row twice).
+        rows = list({row[key]: row for row in map(model.row_from_entry, chunk)}.values())
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={name: stmt.excluded[name] for name in rows[0] if name != key},
+        )
+        db.execute(stmt, rows)
+        db.commit()
+        if cache_key:
+            namespace, column = cache_key
+            for value in {row[column] for row in rows}:
+                response_cache.invalidate(namespace, value)
+        done += len(chunk)
+        if progress:
+            progress(done)
+    return done
+
+
 def upload_public_url_to_r2_and_get_url(public_url: str, key_prefix: str = "uploads/") -> str:
     r2_bucket = os.getenv("R2_BUCKET")
     r2_access_key = os.getenv("R2_ACCESS_KEY")
@@ -236,23 +430,6 @@ def upload_public_url_to_r2_and_get_url(public_url: str, key_prefix: str = "uplo
     if not all([r2_bucket, r2_access_key, r2_secret_key, r2_endpoint, r2_public_url]):
         raise Exception("Missing R2 configuration in environment variables.")
 
-    resp = requests.get(public_url, stream=True, timeout=30)
-    if resp.status_code != 200:
-        raise Exception(f"Failed to download file from {public_url}")
-
-    parsed = urlparse(public_url)
-    filename = unquote(os.path.basename(parsed.path))
-
-    root, ext = os.path.splitext(filename)
-    if not ext:
-        ctype = resp.headers.get("Content-Type", "").split(";")[0]
-        ext = mimetypes.guess_extension(ctype) or ".bin"
-
-    root = re.sub(r"[^A-Za-z0-9._-]+", "-", root).strip("-._")
-    filename = f"{root}{ext}"
-
-    key = f"{key_prefix}{filename}"
-
     session = boto3.session.Session()
     s3 = session.client(
         service_name="s3",
@@ -261,14 +438,8 @@ def upload_public_url_to_r2_and_get_url(public_url: str, key_prefix: str = "uplo
         aws_secret_access_key=r2_secret_key,
     )
 
-    s3.put_object(
-        Bucket=r2_bucket,
-        Key=key,
-        Body=resp.content,
-        ContentType=resp.headers.get("Content-Type", "application/octet-stream"),
-    )
-
-    return f"{r2_public_url.rstrip('/')}/{key}"
+    # Streams the body, stores it under its content hash and skips unchanged sources.
+    return store_url_in_r2(public_url, s3, r2_bucket, r2_public_url, key_prefix)
 
 # If you are getting a 500 error on /api/programs, check the following:
 # 1. The "programs" table exists and is populated.
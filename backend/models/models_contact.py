@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, Text, insert
+from sqlalchemy.orm import Session
+from db import Base
+
+class LeadRecord(Base):
+    __tablename__ = "leads"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    name = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=False, index=True)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=False), default=datetime.utcnow, nullable=False, index=True)
+
+class BookingRecord(Base):
+    __tablename__ = "bookings"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    topic = Column(String(255), nullable=False)
+    scheduled_for = Column(DateTime(timezone=False), nullable=False)
+    status = Column(String(32), nullable=False, default="upcoming")
+    created_at = Column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # GET /bookings pages newest-first by (created_at, id), optionally within one status
+        Index("ix_bookings_created_id", "created_at", "id"),
+        Index("ix_bookings_status_created_id", "status", "created_at", "id"),
+    )
+
+def insert_many(db: Session, model, rows: list[dict]) -> list:
+    """One multi-row INSERT ... RETURNING; returns the inserted rows (ids from the table's sequence)."""
+    if not rows:
+        return []
+    now = datetime.utcnow()
+    rows = [{"created_at": now, **row} for row in rows]
+    # sort_by_parameter_order: insertmanyvalues batches may otherwise return rows out of input order
+    return db.execute(insert(model).returning(*model.__table__.columns, sort_by_parameter_order=True), rows).all()
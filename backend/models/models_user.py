@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from db import Base
 import os
@@ -16,6 +16,8 @@ class User(Base):
     otp_code = Column(String(10), nullable=True)
     otp_expires = Column(DateTime(timezone=False), nullable=True)
     created_at = Column(DateTime(timezone=False), default=datetime.utcnow, nullable=False)
+    # Copied into every token as "ver"; incrementing it revokes all of the user's tokens.
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     def set_otp(self, code: str, minutes_valid: int | None = None):
         mv = minutes_valid or int(os.getenv("OTP_EXP_MIN", "5"))
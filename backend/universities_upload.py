@@ -1,14 +1,16 @@
 import os
 import csv
-import requests
-from bs4 import BeautifulSoup
 import boto3
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import json
-from db import Base, engine, get_db
+from db import Base, engine
 from sqlalchemy import text, inspect
-from models.models import AustraliaScholarship
+from models.models import AustraliaScholarship, ScholarshipModel
+from utils.stream_import import stream_import, require
+from utils.australia_scholarships import touch_reload_marker
+from utils.r2_store import key_prefix_of, store_url_in_r2
+from utils.logo_harvest import LogoHarvester, apply_logo_updates
 import psycopg2
 from psycopg2.extras import execute_values
 
@@ -36,46 +38,28 @@ r2 = session.client(
 )
 
 def upload_to_r2(url, key):
-    try:
-        r2.head_object(Bucket=R2_BUCKET, Key=key)
-        return f"{R2_PUBLIC_URL}/{key}"
-    except r2.exceptions.ClientError as e:
-        if int(e.response['Error']['Code']) != 404:
-            raise
-    resp = requests.get(url)
-    if resp.status_code != 200:
-        raise Exception(f"Failed to fetch image: {url}")
-    r2.put_object(
-        Bucket=R2_BUCKET,
-        Key=key,
-        Body=resp.content,
-        ContentType=resp.headers.get("content-type", "application/octet-stream"),
-        ACL="public-read"
-    )
-    return f"{R2_PUBLIC_URL}/{key}"
+    # Content-addressed under the folder of `key`; unchanged sources are skipped via the manifest.
+    return store_url_in_r2(url, r2, R2_BUCKET, R2_PUBLIC_URL, key_prefix_of(key), acl="public-read")
 
 def ensure_australia_scholarships_table():
     AustraliaScholarship.__table__.create(bind=engine, checkfirst=True)
 
 def import_data():
     data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend/data/australia_scholarships.json")
-    with open(data_path, "r") as f:
-        data = json.load(f)
     ensure_australia_scholarships_table()
     Base.metadata.create_all(bind=engine)
-    with get_db() as db:
-        for entry in data:
-            obj = AustraliaScholarship(
-                university=entry["university"],
-                state=entry.get("state"),
-                type=entry.get("type"),
-                scholarships=entry.get("scholarships", []),
-                common_programs=entry.get("common_programs", []),
-                updated_at=entry.get("updated_at")
-            )
-            db.add(obj)
-    db.commit()
-    db.close()
+    # Streamed and upserted on `university`, so re-running updates rows instead of failing on duplicates.
+    stats = stream_import(data_path, AustraliaScholarship, require("university"))
+    print(f"Australia scholarships import: {stats}")
+    # Running API workers pick up the new rows within AUSTRALIA_SCHOLARSHIPS_CHECK_SECONDS.
+    touch_reload_marker()
+
+
+def import_scholarships(batch_size: int = 500):
+    data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend/data/scholarship.json")
+    ScholarshipModel.__table__.create(bind=engine, checkfirst=True)
+    stats = stream_import(data_path, ScholarshipModel, require("id"), batch_size=batch_size)
+    print(f"Scholarships import: {stats}")
 
 def upload_all_universities_json_to_postgres():
     json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend/data/Australian_Universities.json")
@@ -178,61 +162,6 @@ def upload_all_universities_json_to_postgres():
     conn.close()
     print("Upload complete.")
 
-def extract_logo_and_thumbnail(website_url):
-    """
-    Given a university official website, try to extract logo and thumbnail image URLs.
-    Returns (logo_url, thumbnail_url) or (None, None) if not found.
-    """
-    try:
-        resp = requests.get(website_url, timeout=10)
-        if resp.status_code != 200:
-            return None, None
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Try to find logo: look for <img> with 'logo' in class or alt or src
-        logo = None
-        for img in soup.find_all("img"):
-            attrs = " ".join([str(img.get("class", "")), str(img.get("alt", "")), str(img.get("src", ""))]).lower()
-            if "logo" in attrs:
-                logo = img.get("src")
-                break
-        # Try to find thumbnail: look for <meta property="og:image">
-        thumbnail = None
-        og = soup.find("meta", property="og:image")
-        if og and og.get("content"):
-            thumbnail = og["content"]
-        # Make URLs absolute if needed
-        def abs_url(url):
-            if not url:
-                return None
-            if url.startswith("http"):
-                return url
-            if url.startswith("//"):
-                return "https:" + url
-            return website_url.rstrip("/") + "/" + url.lstrip("/")
-        return abs_url(logo), abs_url(thumbnail)
-    except Exception as e:
-        print(f"Failed to extract logo/thumbnail from {website_url}: {e}")
-        return None, None
-
-def upload_to_r2_from_url(url, key, r2, bucket, public_url):
-    try:
-        r2.head_object(Bucket=bucket, Key=key)
-        return f"{public_url}/{key}"
-    except r2.exceptions.ClientError as e:
-        if int(e.response['Error']['Code']) != 404:
-            raise
-    resp = requests.get(url)
-    if resp.status_code != 200:
-        raise Exception(f"Failed to fetch image: {url}")
-    r2.put_object(
-        Bucket=bucket,
-        Key=key,
-        Body=resp.content,
-        ContentType=resp.headers.get("content-type", "application/octet-stream"),
-        ACL="public-read"
-    )
-    return f"{public_url}/{key}"
-
 def update_all_universities_logo_thumbnail():
     # Load config and R2 client
     R2_BUCKET = os.environ.get("R2_BUCKET")
@@ -284,50 +213,20 @@ def update_all_universities_logo_thumbnail():
     """)
     conn.commit()
 
-    for uni in universities:
-        name = uni.get('name')
-        website = uni.get('official_website')
-        if not website:
-            print(f"Skipping {name}: no official_website")
-            continue
-
-        print(f"Processing {name} ({website}) ...")
-        logo_url, thumb_url = extract_logo_and_thumbnail(website)
-        logo_r2_url = None
-        thumb_r2_url = None
-
-        if logo_url:
-            ext = logo_url.split(".")[-1].split("?")[0][:5]
-            key = f"logos/{name.replace(' ','_')}.{ext}"
-            try:
-                logo_r2_url = upload_to_r2_from_url(logo_url, key, r2, R2_BUCKET, R2_PUBLIC_URL)
-                print(f"  Uploaded logo to {logo_r2_url}")
-            except Exception as e:
-                print(f"  Logo upload failed: {e}")
-
-        if thumb_url:
-            ext = thumb_url.split(".")[-1].split("?")[0][:5]
-            key = f"thumbnails/{name.replace(' ','_')}.{ext}"
-            try:
-                thumb_r2_url = upload_to_r2_from_url(thumb_url, key, r2, R2_BUCKET, R2_PUBLIC_URL)
-                print(f"  Uploaded thumbnail to {thumb_r2_url}")
-            except Exception as e:
-                print(f"  Thumbnail upload failed: {e}")
-
-        # Update all_universities table
-        cur.execute(
-            """
-            UPDATE all_universities
-            SET logo_r2 = %s, thumbnail_r2 = %s
-            WHERE name = %s
-            """,
-            (logo_r2_url, thumb_r2_url, name)
-        )
-        conn.commit()
+    # Fetch/upload concurrently, then write every result in one UPDATE.
+    harvester = LogoHarvester(
+        r2, R2_BUCKET, R2_PUBLIC_URL,
+        workers=int(os.environ.get("HARVEST_WORKERS", "8")),
+        per_host_interval=float(os.environ.get("HARVEST_HOST_INTERVAL", "1.0")),
+    )
+    results = harvester.run(universities)
+    apply_logo_updates(cur, results)
+    conn.commit()
 
     cur.close()
     conn.close()
     print("All logo/thumbnail updates complete.")
 
 # To run:
-update_all_universities_logo_thumbnail()
+if __name__ == "__main__":
+    update_all_universities_logo_thumbnail()
@@ -0,0 +1,291 @@
+"""
+Preloaded snapshot of the `australia_scholarships` table for GET /api/australia-scholarships.
+
+The dataset is a few dozen universities that only change when `import_data()` runs, so it is
+loaded once into memory and every response body is encoded up front: orjson bytes plus gzip
+(and brotli, when the `brotli` package is installed) variants, each with its ETag. A request
+then costs a dict lookup and a write of ready-made bytes.
+
+Filtered responses (state, type, level) are built the first time a combination is asked for
+and kept with the snapshot; the unfiltered list and every single-filter value are built at load.
+
+Reloading: `import_data()` calls `touch_reload_marker()` after a successful import. Workers
+compare the marker's mtime at most every AUSTRALIA_SCHOLARSHIPS_CHECK_SECONDS and rebuild in
+the background, serving the previous snapshot until the new one is swapped in.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from models.models import AustraliaScholarship
+from utils.response_cache import _etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip/identity are offered
+    brotli = None
+
+logger = logging.getLogger("australia_scholarships")
+
+AUSTRALIA_SCHOLARSHIPS_MARKER = os.getenv(
+    "AUSTRALIA_SCHOLARSHIPS_MARKER",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "australia_scholarships.imported"),
+)
+AUSTRALIA_SCHOLARSHIPS_CHECK_SECONDS = float(os.getenv("AUSTRALIA_SCHOLARSHIPS_CHECK_SECONDS", "10"))
+AUSTRALIA_SCHOLARSHIPS_MAX_AGE = int(os.getenv("AUSTRALIA_SCHOLARSHIPS_MAX_AGE", "300"))
+# Bodies smaller than this aren't worth compressing (e.g. the empty list for an unknown state).
+COMPRESS_MIN_BYTES = 512
+
+_SPLIT_RE = re.compile(r"[/,\s]+")
+
+
+def _tokens(value) -> set[str]:
+    """"NSW/WA" -> {"nsw", "wa"}; "UG/PG coursework" -> {"ug", "pg", "coursework"}."""
+    return {t for t in _SPLIT_RE.split(value.lower()) if t} if isinstance(value, str) else set()
+
+
+def _type_key(value) -> Optional[str]:
+    # "Private (International)" files under "private"
+    if not isinstance(value, str):
+        return None
+    return value.split("(")[0].strip().lower() or None
+
+
+def _entries(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def touch_reload_marker(path: str = AUSTRALIA_SCHOLARSHIPS_MARKER):
+    """Tell running workers the table changed."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a"):
+        pass
+    os.utime(path)
+
+
+@dataclass
+class EncodedBody:
+    etag: str
+    identity: bytes
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @classmethod
+    def encode(cls, payload) -> "EncodedBody":
+        raw = orjson.dumps(payload)
+        tag = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        body = cls(etag=f'"{tag}"', identity=raw)
+        if len(raw) >= COMPRESS_MIN_BYTES:
+            body.gzip = gzip.compress(raw, compresslevel=9, mtime=0)
+            if brotli is not None:
+                body.br = brotli.compress(raw, quality=11)
+        return body
+
+
+def _accepted_encodings(header: Optional[str]) -> set[str]:
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+@dataclass
+class _Snapshot:
+    rows: list[dict]
+    by_state: dict[str, set[int]]
+    by_type: dict[str, set[int]]
+    levels: set[str]
+    bodies: dict[tuple, EncodedBody] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def build(cls, rows: list[dict]) -> "_Snapshot":
+        by_state: dict[str, set[int]] = {}
+        by_type: dict[str, set[int]] = {}
+        levels: set[str] = set()
+        for i, row in enumerate(rows):
+            for state in _tokens(row["state"]):
+                by_state.setdefault(state, set()).add(i)
+            type_key = _type_key(row["type"])
+            if type_key:
+                by_type.setdefault(type_key, set()).add(i)
+            for entry in _entries(row["scholarships"]) + _entries(row["common_programs"]):
+                if isinstance(entry, dict):
+                    levels |= _tokens(entry.get("level"))
+        snapshot = cls(rows, by_state, by_type, levels)
+        snapshot.body(None, None, None)
+        for state in by_state:
+            snapshot.body(state, None, None)
+        for type_key in by_type:
+            snapshot.body(None, type_key, None)
+        for level in levels:
+            snapshot.body(None, None, level)
+        return snapshot
+
+    def key(self, state: Optional[str], type_: Optional[str], level: Optional[str]) -> tuple:
+        """Normalized filter; values matching nothing collapse into one key so the memo stays bounded."""
+        state = state.strip().lower() if state else None
+        type_ = _type_key(type_) if type_ else None
+        level = level.strip().lower() if level else None
+        if (state and state not in self.by_state) or (type_ and type_ not in self.by_type) or (level and level not in self.levels):
+            return ("none",)
+        return (state, type_, level)
+
+    def body(self, state: Optional[str], type_: Optional[str], level: Optional[str]) -> EncodedBody:
+        key = self.key(state, type_, level)
+        body = self.bodies.get(key)
+        if body is None:
+            with self.lock:
+                body = self.bodies.get(key)
+                if body is None:
+                    body = self.bodies[key] = EncodedBody.encode(self._select(key))
+        return body
+
+    def _select(self, key: tuple) -> list[dict]:
+        if key == ("none",):
+            return []
+        state, type_, level = key
+        positions = range(len(self.rows))
+        if state:
+            positions = [i for i in positions if i in self.by_state[state]]
+        if type_:
+            positions = [i for i in positions if i in self.by_type[type_]]
+        out = []
+        for i in positions:
+            row = self.rows[i]
+            if level:
+                # keep universities with at least one scholarship at this level, and only those entries
+                matching = {
+                    name: [e for e in _entries(row[name]) if isinstance(e, dict) and level in _tokens(e.get("level"))]
+                    for name in ("scholarships", "common_programs")
+                }
+                if not any(matching.values()):
+                    continue
+                row = {**row, **matching}
+            out.append(row)
+        return out
+
+
+def load_rows(db) -> list[dict]:
+    return [
+        {
+            "id": r.id,
+            "university": r.university,
+            "state": r.state,
+            "type": r.type,
+            "scholarships": r.scholarships,
+            "common_programs": r.common_programs,
+            "updated_at": r.updated_at,
+        }
+        for r in db.execute(select(AustraliaScholarship).order_by(AustraliaScholarship.university)).scalars()
+    ]
+
+
+class AustraliaScholarshipSnapshot:
+    def __init__(self, marker_path: str = AUSTRALIA_SCHOLARSHIPS_MARKER):
+        self.marker_path = marker_path
+        self._snapshot: Optional[_Snapshot] = None
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._build_lock = threading.Lock()
+        self._reloading = False
+        self.loaded_at: Optional[float] = None
+
+    def _marker_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.marker_path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        from db import SessionLocal
+
+        mtime = self._marker_mtime()
+        with SessionLocal() as db:
+            rows = load_rows(db)
+        start = time.perf_counter()
+        self._snapshot = _Snapshot.build(rows)
+        self._loaded_mtime = mtime
+        self.loaded_at = time.time()
+        logger.info("Loaded %d Australian universities (%.0f ms to encode)",
+                    len(rows), (time.perf_counter() - start) * 1000)
+
+    def reload(self):
+        with self._build_lock:
+            self._load()
+
+    def reload_async(self):
+        if self._reloading:
+            return
+
+        def run():
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Reloading australia_scholarships failed; keeping the previous snapshot")
+            finally:
+                self._reloading = False
+
+        self._reloading = True
+        threading.Thread(target=run, name="australia-scholarships-reload", daemon=True).start()
+
+    def snapshot(self) -> _Snapshot:
+        if self._snapshot is None:
+            with self._build_lock:
+                if self._snapshot is None:
+                    self._load()
+        elif time.monotonic() - self._checked_at > AUSTRALIA_SCHOLARSHIPS_CHECK_SECONDS:
+            self._checked_at = time.monotonic()
+            if self._marker_mtime() != self._loaded_mtime:
+                self.reload_async()
+        return self._snapshot
+
+    def respond(self, request: Request, state: Optional[str] = None, type_: Optional[str] = None,
+                level: Optional[str] = None) -> Response:
+        body = self.snapshot().body(state, type_, level)
+        accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+        if body.br is not None and "br" in accepted:
+            encoding, content = "br", body.br
+        elif body.gzip is not None and ("gzip" in accepted or "*" in accepted):
+            encoding, content = "gzip", body.gzip
+        else:
+            encoding, content = None, body.identity
+        # One ETag per representation, so caches never hand a compressed body to a client that didn't ask.
+        etag = body.etag if encoding is None else f'{body.etag[:-1]}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": f"public, max-age={AUSTRALIA_SCHOLARSHIPS_MAX_AGE}",
+        }
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "loaded_at": self.loaded_at,
+            "universities": len(snapshot.rows) if snapshot else 0,
+            "encoded_variants": len(snapshot.bodies) if snapshot else 0,
+            "brotli": brotli is not None,
+        }
+
+
+australia_scholarships = AustraliaScholarshipSnapshot()
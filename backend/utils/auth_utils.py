@@ -1,4 +1,5 @@
-import os, bcrypt, jwt
+import os, bcrypt, jwt, asyncio, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -6,8 +7,18 @@ JWT_SECRET = os.getenv("JWT_SECRET", "dev_secret_change_me")
 JWT_ALG = "HS256"
 JWT_EXP_MIN = 60 * 24  # 24h
 
-def hash_password(raw: str) -> str:
-    return bcrypt.hashpw(raw.encode(), bcrypt.gensalt()).decode()
+# bcrypt work factor; raising it makes existing hashes get upgraded on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in a process pool so it scales across cores and never holds request threads.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Max hash/verify jobs queued or running at once; further callers wait for a slot.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+_executor: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+
+def hash_password(raw: str, rounds: int | None = None) -> str:
+    return bcrypt.hashpw(raw.encode(), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode()
 
 def verify_password(raw: str, hashed: str) -> bool:
     try:
@@ -15,8 +26,44 @@ def verify_password(raw: str, hashed: str) -> bool:
     except Exception:
         return False
 
-def create_token(sub: str) -> str:
+def needs_rehash(hashed: str) -> bool:
+    """True if `hashed` was made with a different bcrypt cost than BCRYPT_ROUNDS ($2b$<cost>$...)."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def _hash_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: never fork a process that is running the event loop and DB pool threads
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+async def _run_hashing(fn, *args):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor(), fn, *args)
+
+async def hash_password_async(raw: str) -> str:
+    return await _run_hashing(hash_password, raw, BCRYPT_ROUNDS)
+
+async def verify_password_async(raw: str, hashed: str) -> bool:
+    return await _run_hashing(verify_password, raw, hashed)
+
+def shutdown_hash_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def create_token(sub: str, claims: dict[str, Any] | None = None) -> str:
     payload: dict[str, Any] = {
+        **(claims or {}),
         "sub": sub,
         "exp": datetime.utcnow() + timedelta(minutes=JWT_EXP_MIN),
         "iat": datetime.utcnow(),
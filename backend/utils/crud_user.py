@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
 from models.models_user import User
 
 def get_user_by_email(db: Session, email: str) -> User | None:
@@ -14,4 +15,23 @@ def update_user_status(db: Session, email: str, is_verified: bool) -> None:
     user = get_user_by_email(db, email)
     if user:
         user.is_verified = is_verified
-        db.commit()
\ No newline at end of file
+        db.commit()
+
+# AsyncSession versions for the async request handlers (create_user works with either session).
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> User | None:
+    return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+
+async def update_password_hash_async(db: AsyncSession, user_id, password_hash: str) -> None:
+    await db.execute(update(User).where(User.id == user_id).values(password_hash=password_hash))
+
+async def get_token_version_async(db: AsyncSession, user_id) -> int | None:
+    return (await db.execute(select(User.token_version).where(User.id == user_id))).scalar_one_or_none()
+
+async def revoke_tokens_async(db: AsyncSession, user_id) -> int | None:
+    """Invalidate every token issued so far for `user_id`; returns the new version."""
+    return (await db.execute(
+        update(User).where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )).scalar_one_or_none()
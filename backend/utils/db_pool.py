@@ -0,0 +1,137 @@
+"""
+Connection pool settings and instrumentation for the engines in db.py.
+
+`InstrumentedQueuePool` / `InstrumentedAsyncQueuePool` time every checkout (wait for a free
+connection + opening or pinging one) and count how often the pool was saturated, timed out,
+or had to replace a dead connection. `pool_metrics(engine)` returns the counters with the
+pool's current occupancy; GET /debug/pool shows them for both engines.
+
+`install_ping(engine, interval)` replaces `pool_pre_ping` (a round trip on *every* checkout)
+with a ping only for connections that sat idle in the pool longer than `interval` seconds,
+which is when a remote server or load balancer may have dropped them.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self, samples: int = 2048):
+        self._lock = threading.Lock()
+        self._checkout_ms: deque[float] = deque(maxlen=samples)
+        self.checkouts = 0
+        self.saturated = 0  # checkouts that found every connection (incl. overflow) in use
+        self.wait_ms_total = 0.0
+        self.timeouts = 0
+        self.pings = 0
+        self.dead_connections = 0
+
+    def record(self, elapsed_ms: float, saturated: bool):
+        with self._lock:
+            self.checkouts += 1
+            self._checkout_ms.append(elapsed_ms)
+            if saturated:
+                self.saturated += 1
+                self.wait_ms_total += elapsed_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._checkout_ms)
+            counters = {
+                "checkouts": self.checkouts,
+                "saturated_checkouts": self.saturated,
+                "wait_ms_total": round(self.wait_ms_total, 1),
+                "timeouts": self.timeouts,
+                "pings": self.pings,
+                "dead_connections": self.dead_connections,
+            }
+
+        def pct(p: float):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2) if samples else None
+
+        counters["checkout_ms"] = {"p50": pct(0.5), "p99": pct(0.99), "max": pct(1.0), "samples": len(samples)}
+        return counters
+
+
+class _Instrumented:
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        saturated = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            with self.metrics._lock:
+                self.metrics.timeouts += 1
+            raise
+        self.metrics.record((time.perf_counter() - start) * 1000, saturated)
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.metrics = self.metrics  # keep the counters across engine.dispose()
+        return new
+
+
+class InstrumentedQueuePool(_Instrumented, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_Instrumented, AsyncAdaptedQueuePool):
+    pass
+
+
+def install_ping(engine, interval: float):
+    """Ping connections idle for more than `interval` seconds before handing them out."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+
+    @event.listens_for(sync_engine, "connect")
+    def _connected(dbapi_connection, record):
+        record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checked_in(dbapi_connection, record):
+        if record is not None:
+            record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checked_out(dbapi_connection, record, proxy):
+        if time.monotonic() - record.info.get("idle_since", 0.0) <= interval:
+            return
+        metrics = getattr(pool, "metrics", None)
+        if metrics is not None:
+            metrics.pings += 1
+        try:
+            alive = sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as err:
+            if not sync_engine.dialect.is_disconnect(err, dbapi_connection, None):
+                raise
+            alive = False
+        if not alive:
+            if metrics is not None:
+                metrics.dead_connections += 1
+            # the pool discards this connection and retries the checkout with a fresh one
+            raise exc.DisconnectionError()
+
+
+def pool_metrics(engine) -> dict:
+    pool = getattr(engine, "sync_engine", engine).pool
+    in_use = pool.checkedout()
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": in_use,
+        "idle": pool.checkedin(),
+        "saturation": round(in_use / capacity, 3) if capacity else None,
+        **(pool.metrics.snapshot() if hasattr(pool, "metrics") else {}),
+    }
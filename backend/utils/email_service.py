@@ -1,6 +1,11 @@
-import os, smtplib, logging, socket
+import os, smtplib, logging, socket, queue, threading, time, uuid
+from dataclasses import dataclass
+from email import message_from_bytes, policy
 from email.message import EmailMessage
 from contextlib import closing
+from typing import Optional
+
+from utils.cache import TTLCache
 
 logger = logging.getLogger("otp_mail")
 
@@ -12,14 +17,31 @@ SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
 APP_NAME = os.getenv("APP_NAME", "StudConnect")
 SMTP_DISABLE = os.getenv("SMTP_DISABLE", "0") == "1"      # new: force-disable sending
 SMTP_STRICT = os.getenv("SMTP_STRICT", "0") == "1"        # new: raise on any failure (production)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"    # 0 for plain relays / local stubs
+# Delivery queue: worker threads each keep one SMTP connection open while there is mail to send.
+SMTP_WORKERS = int(os.getenv("SMTP_WORKERS", "2"))
+SMTP_QUEUE_SIZE = int(os.getenv("SMTP_QUEUE_SIZE", "1000"))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BACKOFF = float(os.getenv("SMTP_RETRY_BACKOFF", "2"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "30"))  # close a worker's connection after this long idle
+SMTP_SPOOL_DIR = os.getenv("SMTP_SPOOL_DIR")                   # set to keep queued mail across restarts
+SMTP_DIAG_TTL = float(os.getenv("SMTP_DIAG_TTL", "60"))
+
+_diag_cache = TTLCache(maxsize=1, ttl=SMTP_DIAG_TTL)
 
 def _smtp_config_complete() -> bool:
-    return all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM])
+    # user/password are optional: without them we skip AUTH (plain relays, local stubs)
+    return all([SMTP_HOST, SMTP_PORT, SMTP_FROM]) and bool(SMTP_USER) == bool(SMTP_PASSWORD)
 
-def smtp_diagnostics() -> dict:
+def smtp_diagnostics(refresh: bool = False) -> dict:
     """
     Returns a quick diagnostic dict (does not attempt authentication unless host resolves).
+    Cached for SMTP_DIAG_TTL seconds since it does DNS + a TCP connect.
     """
+    if not refresh:
+        cached = _diag_cache.get("diag")
+        if cached is not None:
+            return cached
     diag = {
         "host": SMTP_HOST,
         "port": SMTP_PORT,
@@ -30,38 +52,234 @@ def smtp_diagnostics() -> dict:
         "can_connect": None,
         "disabled": SMTP_DISABLE,
         "strict": SMTP_STRICT,
+        "starttls": SMTP_STARTTLS,
         "complete_config": _smtp_config_complete()
     }
-    if not SMTP_HOST:
-        return diag
-    try:
-        socket.gethostbyname(SMTP_HOST)
-        diag["resolves"] = True
-    except socket.gaierror:
-        diag["resolves"] = False
-        return diag
-    # Try TCP connect
-    try:
-        with closing(socket.create_connection((SMTP_HOST, SMTP_PORT), timeout=5)):
-            diag["can_connect"] = True
-    except OSError:
-        diag["can_connect"] = False
+    if SMTP_HOST:
+        try:
+            socket.gethostbyname(SMTP_HOST)
+            diag["resolves"] = True
+        except socket.gaierror:
+            diag["resolves"] = False
+    if diag["resolves"]:
+        # Try TCP connect
+        try:
+            with closing(socket.create_connection((SMTP_HOST, SMTP_PORT), timeout=5)):
+                diag["can_connect"] = True
+        except OSError:
+            diag["can_connect"] = False
+    _diag_cache.set("diag", diag)
     return diag
 
-def send_otp(email: str, code: str) -> bool:
+
+@dataclass
+class SMTPConfig:
+    host: str
+    port: int = 587
+    user: Optional[str] = None
+    password: Optional[str] = None
+    sender: Optional[str] = None
+    starttls: bool = True
+    timeout: float = 15
+
+    @classmethod
+    def from_env(cls) -> "SMTPConfig":
+        return cls(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM, SMTP_STARTTLS)
+
+    def connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+
+def _is_permanent(exc: Exception) -> bool:
+    # 5xx replies and refused recipients won't succeed on retry
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+class MailQueue:
     """
-    Send OTP via SMTP. Returns True if we consider it 'sent'.
-    Honors:
-      - SMTP_DISABLE=1 : always succeed, log code (dev)
-      - SMTP_STRICT=1  : any failure => return False
+    Bounded outgoing mail queue drained by worker threads.
+
+    Each worker keeps its SMTP connection open between messages (closing it after
+    SMTP_IDLE_SECONDS idle) and reconnects when the server drops it. Transient failures are
+    retried with exponential backoff. With `spool_dir`, every queued message is also written
+    to disk until delivered, and messages left over from a previous run are queued on start.
     """
-    subject = f"{APP_NAME} Email Verification Code"
-    text_body = (
+
+    def __init__(
+        self,
+        config: Optional[SMTPConfig] = None,
+        workers: int = SMTP_WORKERS,
+        maxsize: int = SMTP_QUEUE_SIZE,
+        max_retries: int = SMTP_MAX_RETRIES,
+        backoff: float = SMTP_RETRY_BACKOFF,
+        idle_seconds: float = SMTP_IDLE_SECONDS,
+        spool_dir: Optional[str] = SMTP_SPOOL_DIR,
+    ):
+        self.config = config
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_seconds = idle_seconds
+        self.spool_dir = spool_dir
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._counters = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0, "rejected_full": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def start(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            if self.config is None:
+                self.config = SMTPConfig.from_env()
+            if self.spool_dir:
+                os.makedirs(self.spool_dir, exist_ok=True)
+                self._requeue_spool()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"smtp-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout: float = 10):
+        """Let the workers finish what is queued, then close their connections."""
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join(timeout)
+
+    def _requeue_spool(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".eml"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            with open(path, "rb") as f:
+                msg = message_from_bytes(f.read(), policy=policy.default)
+            try:
+                self._queue.put_nowait((msg, path))
+                self._count("queued")
+            except queue.Full:
+                logger.warning("Mail queue full; %s stays spooled until the next start", name)
+                return
+
+    def _spool(self, msg: EmailMessage) -> Optional[str]:
+        if not self.spool_dir:
+            return None
+        path = os.path.join(self.spool_dir, f"{time.time_ns()}-{uuid.uuid4().hex}.eml")
+        with open(path + ".tmp", "wb") as f:
+            f.write(msg.as_bytes())
+        os.replace(path + ".tmp", path)
+        return path
+
+    def enqueue(self, msg: EmailMessage) -> bool:
+        """Queue `msg` for delivery; False if the queue is full."""
+        self.start()
+        path = self._spool(msg)
+        try:
+            self._queue.put_nowait((msg, path))
+        except queue.Full:
+            if path:
+                os.remove(path)
+            self._count("rejected_full")
+            return False
+        self._count("queued")
+        return True
+
+    def _work(self):
+        conn: Optional[smtplib.SMTP] = None
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                conn = self._close(conn)
+                continue
+            if item is None:
+                self._close(conn)
+                return
+            msg, path = item
+            conn = self._deliver(conn, msg, path)
+
+    def _deliver(self, conn: Optional[smtplib.SMTP], msg: EmailMessage, path: Optional[str]) -> Optional[smtplib.SMTP]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                if conn is None:
+                    conn = self.config.connect()
+                    self._count("connections")
+                conn.send_message(msg)
+            except (smtplib.SMTPException, OSError) as e:
+                if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                    # dropped / broken connection: reconnect on the next attempt
+                    conn = self._close(conn)
+                if _is_permanent(e) or attempt == self.max_retries:
+                    logger.error("Giving up on mail to %s after %d attempt(s): %s", msg["To"], attempt + 1, e)
+                    self._count("failed")
+                    if path:
+                        os.replace(path, path + ".failed")
+                    return conn
+                self._count("retries")
+                time.sleep(self.backoff * (2 ** attempt))
+                continue
+            logger.info("Sent mail to %s", msg["To"])
+            self._count("sent")
+            if path:
+                os.remove(path)
+            return conn
+
+    @staticmethod
+    def _close(conn: Optional[smtplib.SMTP]) -> None:
+        if conn is not None:
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                conn.close()
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "pending": self._queue.qsize(), "workers": len(self._threads)}
+
+
+mail_queue = MailQueue()
+
+def otp_message(email: str, code: str, sender: Optional[str] = None) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = f"{APP_NAME} Email Verification Code"
+    msg["From"] = sender or SMTP_FROM
+    msg["To"] = email
+    msg.set_content(
         f"Hi,\n\nYour {APP_NAME} verification code is: {code}\n"
         "It expires in a few minutes. If you did not initiate this request, please ignore this message.\n\n"
         f"Regards,\n{APP_NAME} Team"
     )
+    return msg
 
+def send_otp(email: str, code: str) -> bool:
+    """
+    Queue the OTP mail for background delivery. Returns True if we consider it 'sent'.
+    Honors:
+      - SMTP_DISABLE=1 : always succeed, log code (dev)
+      - SMTP_STRICT=1  : any failure => return False
+    Delivery errors after queueing are only logged (see mail_queue.stats()).
+    """
     if SMTP_DISABLE:
         logger.warning("[SMTP_DISABLED] OTP for %s -> %s", email, code)
         return True
@@ -70,7 +288,7 @@ def send_otp(email: str, code: str) -> bool:
         logger.warning("[SMTP_FALLBACK] Incomplete SMTP config; OTP=%s email=%s", code, email)
         return not SMTP_STRICT  # succeed if not strict
 
-    # Pre-flight resolution / connection diagnostics
+    # Cached pre-flight diagnostics: don't queue mail for a host we know is unreachable
     diag = smtp_diagnostics()
     if not diag.get("resolves"):
         logger.error("SMTP host resolution failed: %s (OTP=%s)", SMTP_HOST, code)
@@ -79,19 +297,7 @@ def send_otp(email: str, code: str) -> bool:
         logger.error("SMTP host unreachable (port %s): %s (OTP=%s)", SMTP_PORT, SMTP_HOST, code)
         return not SMTP_STRICT
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = SMTP_FROM
-    msg["To"] = email
-    msg.set_content(text_body)
-
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=15) as smtp:
-            smtp.starttls()
-            smtp.login(SMTP_USER, SMTP_PASSWORD)
-            smtp.send_message(msg)
-        logger.info("Sent OTP email to %s", email)
-        return True
-    except (smtplib.SMTPException, OSError, socket.error) as e:
-        logger.error("Failed sending OTP email to %s: %s", email, e)
+    if not mail_queue.enqueue(otp_message(email, code)):
+        logger.error("Mail queue full; dropping OTP email to %s (OTP=%s)", email, code)
         return not SMTP_STRICT
+    return True
@@ -0,0 +1,164 @@
+"""
+Concurrent logo/thumbnail harvesting for `all_universities`.
+
+Each university homepage is fetched and parsed on a bounded thread pool. All HTTP goes
+through one pooled `requests.Session` with retry/backoff and a per-host rate limit, and
+images are copied into R2 (any S3-compatible endpoint) via utils/r2_store. Results are
+returned to the caller, which writes them with a single batched UPDATE (`apply_logo_updates`).
+
+HTTP session, S3 client, bucket and public URL are all injected, so the harvester can run
+against a local stub HTTP server and a local S3 stand-in (MinIO, moto server, ...).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from psycopg2.extras import execute_values
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.r2_store import default_manifest, store_url_in_r2
+
+
+def make_http_session(pool_size: int = 16, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """Shared session: keep-alive connection pool per host plus retry with exponential backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    http = requests.Session()
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    http.headers["User-Agent"] = "StudConnect-LogoHarvester/1.0"
+    return http
+
+
+class HostRateLimiter:
+    """Allows at most one request per `min_interval` seconds to any single host."""
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._next: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def extract_logo_and_thumbnail(website_url, http=requests, limiter: Optional[HostRateLimiter] = None):
+    """
+    Given a university official website, try to extract logo and thumbnail image URLs.
+    Returns (logo_url, thumbnail_url) or (None, None) if not found.
+    """
+    try:
+        if limiter:
+            limiter.wait(website_url)
+        resp = http.get(website_url, timeout=10)
+        if resp.status_code != 200:
+            return None, None
+        soup = BeautifulSoup(resp.text, "html.parser")
+        # Try to find logo: look for <img> with 'logo' in class or alt or src
+        logo = None
+        for img in soup.find_all("img"):
+            attrs = " ".join([str(img.get("class", "")), str(img.get("alt", "")), str(img.get("src", ""))]).lower()
+            if "logo" in attrs:
+                logo = img.get("src")
+                break
+        # Try to find thumbnail: look for <meta property="og:image">
+        thumbnail = None
+        og = soup.find("meta", property="og:image")
+        if og and og.get("content"):
+            thumbnail = og["content"]
+        # Make URLs absolute if needed
+        def abs_url(url):
+            if not url:
+                return None
+            if url.startswith("http"):
+                return url
+            if url.startswith("//"):
+                return "https:" + url
+            return website_url.rstrip("/") + "/" + url.lstrip("/")
+        return abs_url(logo), abs_url(thumbnail)
+    except Exception as e:
+        print(f"Failed to extract logo/thumbnail from {website_url}: {e}")
+        return None, None
+
+
+class LogoHarvester:
+    def __init__(
+        self,
+        r2,
+        bucket: str,
+        public_url: str,
+        http: Optional[requests.Session] = None,
+        workers: int = 8,
+        per_host_interval: float = 1.0,
+    ):
+        self.r2 = r2
+        self.bucket = bucket
+        self.public_url = public_url
+        self.http = http or make_http_session(pool_size=workers * 2)
+        self.workers = workers
+        self.limiter = HostRateLimiter(per_host_interval)
+
+    def _upload(self, image_url: str, prefix: str, name: str) -> Optional[str]:
+        try:
+            self.limiter.wait(image_url)
+            return store_url_in_r2(
+                image_url, self.r2, self.bucket, self.public_url, f"{prefix}/",
+                http=self.http, acl="public-read",
+            )
+        except Exception as e:
+            print(f"  {name}: {prefix} upload failed: {e}")
+            return None
+
+    def harvest_one(self, uni: dict) -> Optional[tuple[str, Optional[str], Optional[str]]]:
+        """(name, logo_r2_url, thumbnail_r2_url) for one university, or None if it has no website."""
+        name = uni.get('name')
+        website = uni.get('official_website')
+        if not name or not website:
+            print(f"Skipping {name}: no official_website")
+            return None
+        logo_url, thumb_url = extract_logo_and_thumbnail(website, http=self.http, limiter=self.limiter)
+        logo_r2_url = self._upload(logo_url, "logos", name) if logo_url else None
+        thumb_r2_url = self._upload(thumb_url, "thumbnails", name) if thumb_url else None
+        print(f"Processed {name}: logo={logo_r2_url} thumbnail={thumb_r2_url}")
+        return name, logo_r2_url, thumb_r2_url
+
+    def run(self, universities: Iterable[dict]) -> list[tuple[str, Optional[str], Optional[str]]]:
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="harvest") as pool:
+                return [r for r in pool.map(self.harvest_one, universities) if r is not None]
+        finally:
+            default_manifest().flush()
+
+
+def apply_logo_updates(cur, results: list[tuple[str, Optional[str], Optional[str]]]):
+    """One UPDATE ... FROM (VALUES ...) for all harvested rows; the caller commits."""
+    if not results:
+        return
+    execute_values(
+        cur,
+        """
+        UPDATE all_universities AS u
+        SET logo_r2 = v.logo_r2, thumbnail_r2 = v.thumbnail_r2
+        FROM (VALUES %s) AS v(name, logo_r2, thumbnail_r2)
+        WHERE u.name = v.name
+        """,
+        results,
+        page_size=len(results),
+    )
@@ -0,0 +1,28 @@
+import base64
+import json
+from typing import Any
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, key: list[Any], direction: str = "next") -> str:
+    """
+    Opaque keyset cursor: the sort column name, the (sort value, id) key of the
+    boundary row and the direction to seek in from it.
+    """
+    payload = {"s": sort, "k": key, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(payload, dict) or not isinstance(payload.get("k"), list) or payload.get("d") not in ("next", "prev"):
+        raise InvalidCursor("Malformed cursor")
+    return payload
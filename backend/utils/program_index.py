@@ -0,0 +1,288 @@
+"""
+Optional in-memory index over the `programs` table for /api/programs/filter.
+
+The catalogue only changes when the import scripts run, so the filter endpoint can be
+served from columnar numpy arrays instead of Postgres:
+  - tuition as a float array (NaN = unknown, so range filters drop it like SQL NULL)
+  - school name / country interned to integer codes, with a trigram index over the
+    distinct school names for partial (ILIKE '%...%' style) matching
+  - precomputed sort permutations and tuition buckets for facet counts
+
+Enable with PROGRAM_INDEX=1. The index is built in a background thread at startup and
+rebuilt on SIGHUP (or `program_index.reload_async()`); queries keep hitting the previous
+snapshot until the new one is swapped in.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from models.models import Program
+
+logger = logging.getLogger("program_index")
+
+PROGRAM_INDEX_ENABLED = os.getenv("PROGRAM_INDEX", "0") == "1"
+TUITION_BUCKETS = [int(x) for x in os.getenv("PROGRAM_INDEX_TUITION_BUCKETS", "10000,20000,30000,40000,50000").split(",")]
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class _Vocabulary:
+    """Interned strings (code 0 is reserved for NULL) plus a trigram -> codes index.
+    Only ever grows, so reloads reuse the codes and postings of names already seen."""
+
+    def __init__(self):
+        self.values: list[Optional[str]] = [None]
+        self.lowered: list[str] = [""]
+        self._codes: dict[str, int] = {}
+        self._grams: dict[str, set[int]] = {}
+        self._matches: dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = len(self.values)
+                self._codes[value] = code
+                self.values.append(value)
+                lowered = value.lower()
+                self.lowered.append(lowered)
+                for gram in _trigrams(lowered):
+                    self._grams.setdefault(gram, set()).add(code)
+                self._matches.clear()
+        return code
+
+    def match(self, needle: str) -> np.ndarray:
+        """Codes whose value contains `needle`, case-insensitively."""
+        needle = needle.lower()
+        cached = self._matches.get(needle)
+        if cached is not None:
+            return cached
+        grams = _trigrams(needle)
+        with self._lock:
+            if grams:
+                postings = sorted((self._grams.get(g, set()) for g in grams), key=len)
+                candidates = set.intersection(*postings) if postings[0] else set()
+            else:
+                candidates = range(1, len(self.values))
+            codes = np.fromiter(sorted(c for c in candidates if needle in self.lowered[c]), dtype=np.int32)
+            if len(self._matches) >= 4096:
+                self._matches.clear()
+            self._matches[needle] = codes
+            return codes
+
+
+def _postings(codes: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Row positions grouped by code: rows[start[c]:start[c + 1]] are the rows with code c (ascending)."""
+    rows = np.argsort(codes, kind="stable")
+    start = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=size), out=start[1:])
+    return rows, start
+
+
+@dataclass
+class _Snapshot:
+    ids: list[str]
+    types: list[Optional[str]]
+    attributes: list[Any]
+    school_code: np.ndarray
+    country_code: np.ndarray
+    tuition: np.ndarray
+    tuition_bucket: np.ndarray
+    # Posting lists per school / country code and rows sorted by tuition (NaN last).
+    school_postings: tuple[np.ndarray, np.ndarray]
+    country_postings: tuple[np.ndarray, np.ndarray]
+    tuition_order: np.ndarray
+    sorted_tuition: np.ndarray
+    # Row order and per-row rank under each sort key; rows are stored in id order.
+    orders: dict[str, np.ndarray]
+    ranks: dict[str, Optional[np.ndarray]]
+    unfiltered_facets: dict
+    built_at: float
+
+
+class ProgramIndex:
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._schools = _Vocabulary()
+        self._countries = _Vocabulary()
+        self._build_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def build(self, rows: Iterable[tuple]):
+        """rows: (id, type, attributes, school_name, country, tuition), ordered by id."""
+        with self._build_lock:
+            ids, types, attributes = [], [], []
+            school_codes, country_codes, tuitions, names = [], [], [], []
+            for id_, type_, attrs, school_name, country, tuition in rows:
+                ids.append(id_)
+                types.append(type_)
+                attributes.append(attrs)
+                school_codes.append(self._schools.code(school_name))
+                country_codes.append(self._countries.code(country))
+                tuitions.append(np.nan if tuition is None else tuition)
+                name = attrs.get("name") if isinstance(attrs, dict) else None
+                names.append(name if isinstance(name, str) else "")
+
+            school_code = np.asarray(school_codes, dtype=np.int32)
+            country_code = np.asarray(country_codes, dtype=np.int32)
+            tuition = np.asarray(tuitions, dtype=np.float64)
+            bucket = np.digitize(np.nan_to_num(tuition, nan=-1), TUITION_BUCKETS).astype(np.int8)
+            bucket[np.isnan(tuition)] = -1
+
+            school_names = self._schools.values
+            orders = {"id": np.arange(len(ids))}
+            ranks = {"id": None}
+            for key, sort_key in (
+                ("name", lambda i: (names[i], ids[i])),
+                ("school_name", lambda i: (school_names[school_codes[i]] or "", ids[i])),
+            ):
+                order = np.asarray(sorted(range(len(ids)), key=sort_key), dtype=np.int64)
+                rank = np.empty(len(ids), dtype=np.int64)
+                rank[order] = np.arange(len(ids))
+                orders[key], ranks[key] = order, rank
+            tuition_order = np.argsort(tuition, kind="stable")
+
+            snapshot = _Snapshot(
+                ids=ids,
+                types=types,
+                attributes=attributes,
+                school_code=school_code,
+                country_code=country_code,
+                tuition=tuition,
+                tuition_bucket=bucket,
+                school_postings=_postings(school_code, len(self._schools.values)),
+                country_postings=_postings(country_code, len(self._countries.values)),
+                tuition_order=tuition_order,
+                sorted_tuition=tuition[tuition_order],
+                orders=orders,
+                ranks=ranks,
+                unfiltered_facets={},
+                built_at=time.time(),
+            )
+            snapshot.unfiltered_facets = self._facets(snapshot, None)
+            self._snapshot = snapshot
+            logger.info("Program index built: %d programs", len(ids))
+
+    def load(self, db):
+        rows = db.execute(
+            select(Program.id, Program.type, Program.attributes, Program.school_name, Program.country, Program.tuition)
+            .order_by(Program.id)
+        )
+        self.build(rows)
+
+    def reload_async(self):
+        from db import SessionLocal
+
+        def _run():
+            try:
+                with SessionLocal() as db:
+                    self.load(db)
+            except Exception:
+                logger.exception("Program index reload failed")
+
+        threading.Thread(target=_run, name="program-index-reload", daemon=True).start()
+
+    def _facets(self, snap: _Snapshot, hits: Optional[np.ndarray]) -> dict:
+        countries = snap.country_code if hits is None else snap.country_code[hits]
+        buckets = snap.tuition_bucket if hits is None else snap.tuition_bucket[hits]
+        country_counts = np.bincount(countries, minlength=len(snap.country_postings[1]) - 1)
+        bucket_counts = np.bincount(buckets + 1, minlength=len(TUITION_BUCKETS) + 2)
+        edges = [None] + TUITION_BUCKETS + [None]
+        return {
+            "country": {
+                self._countries.values[code]: n
+                for code, n in enumerate(country_counts.tolist())
+                if n and code
+            },
+            "tuition": [
+                {"min": edges[b], "max": edges[b + 1], "count": int(bucket_counts[b + 1])}
+                for b in range(len(TUITION_BUCKETS) + 1)
+            ],
+        }
+
+    @staticmethod
+    def _rows_for(postings: tuple[np.ndarray, np.ndarray], codes: np.ndarray, row_codes: np.ndarray) -> np.ndarray:
+        rows, start = postings
+        codes = codes[codes < len(start) - 1]
+        if not codes.size:
+            return np.empty(0, dtype=np.int64)
+        if codes.size == 1:
+            return rows[start[codes[0]]:start[codes[0] + 1]]
+        if (start[codes + 1] - start[codes]).sum() * 8 > rows.size:
+            # Broad match: one pass over the code column beats merging many postings.
+            lut = np.zeros(len(start) - 1, dtype=bool)
+            lut[codes] = True
+            return np.flatnonzero(lut[row_codes])
+        return np.sort(np.concatenate([rows[start[c]:start[c + 1]] for c in codes.tolist()]))
+
+    def query(
+        self,
+        school_name: Optional[str] = None,
+        country: Optional[str] = None,
+        min_fees: Optional[int] = None,
+        max_fees: Optional[int] = None,
+        sort: str = "id",
+        offset: int = 0,
+        limit: int = 50,
+    ) -> dict:
+        snap = self._snapshot
+        # Candidate row positions (ascending), narrowed by the most selective structure
+        # available for each filter; None means "every row".
+        hits: Optional[np.ndarray] = None
+        if school_name:
+            hits = self._rows_for(snap.school_postings, self._schools.match(school_name), snap.school_code)
+        if country:
+            codes = self._countries.match(country)
+            if hits is None:
+                hits = self._rows_for(snap.country_postings, codes, snap.country_code)
+            else:
+                lut = np.zeros(len(snap.country_postings[1]) - 1, dtype=bool)
+                lut[codes[codes < lut.size]] = True
+                hits = hits[lut[snap.country_code[hits]]]
+        if min_fees is not None or max_fees is not None:
+            lo = -np.inf if min_fees is None else min_fees
+            hi = np.inf if max_fees is None else max_fees
+            if hits is None:
+                a = np.searchsorted(snap.sorted_tuition, lo, side="left")
+                b = np.searchsorted(snap.sorted_tuition, hi, side="right")
+                hits = np.sort(snap.tuition_order[a:b])
+            else:
+                t = snap.tuition[hits]
+                hits = hits[(t >= lo) & (t <= hi)]
+
+        if hits is None:
+            total = len(snap.ids)
+            page = snap.orders[sort][offset:offset + limit]
+            facets = snap.unfiltered_facets
+        else:
+            total = int(hits.size)
+            rank = snap.ranks[sort]
+            ordered = hits if rank is None else hits[np.argsort(rank[hits], kind="stable")]
+            page = ordered[offset:offset + limit]
+            facets = self._facets(snap, hits)
+
+        return {
+            "items": [
+                {"id": snap.ids[i], "type": snap.types[i], "attributes": snap.attributes[i]}
+                for i in page.tolist()
+            ],
+            "total": total,
+            "facets": facets,
+        }
+
+
+program_index = ProgramIndex()
@@ -0,0 +1,140 @@
+"""
+Sparse fieldsets for endpoints that return large JSONB documents.
+
+`fields=id,attributes.name,attributes.location.city` asks for those paths only. The spec is
+parsed into a tree ({"id": {}, "attributes": {"name": {}, "location": {"city": {}}}}, an empty
+dict meaning "the whole value") and turned into SQL, so Postgres trims the blobs before they
+are sent over the wire:
+
+    tree = parse_fields("id,attributes.name")
+    stmt = select(json_text(project_row({"id": Program.id, "attributes": Program.attributes}, tree)))
+
+Nested paths are followed with `->` through JSONB objects; an array (or any non-object) is
+returned whole at the path that reaches it. Keys that don't exist are left out rather than
+sent as null, so clients see the same shape as in the full document. `project_dict` applies
+the same rules to already-decoded documents (e.g. the in-memory program index).
+"""
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import JSON, case, func, literal_column, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+
+FIELD_NAME = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+MAX_FIELDS = 64
+MAX_DEPTH = 6
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def _freeze(tree: dict) -> tuple:
+    return tuple((key, _freeze(sub)) for key, sub in tree.items())
+
+
+def _thaw(frozen: tuple) -> dict:
+    return {key: _thaw(sub) for key, sub in frozen}
+
+
+@lru_cache(maxsize=512)
+def _parse(spec: str) -> tuple:
+    tree: dict = {}
+    paths = [p.strip() for p in spec.split(",") if p.strip()]
+    if len(paths) > MAX_FIELDS:
+        raise InvalidFields(f"At most {MAX_FIELDS} fields can be requested")
+    for path in paths:
+        parts = path.split(".")
+        if len(parts) > MAX_DEPTH:
+            raise InvalidFields(f"Field paths are limited to {MAX_DEPTH} levels: {path!r}")
+        bad = next((p for p in parts if not FIELD_NAME.match(p)), None)
+        if bad is not None:
+            raise InvalidFields(f"Invalid field name {bad!r} in {path!r}")
+        node = tree
+        for i, part in enumerate(parts):
+            if part in node and not node[part]:
+                break  # a shorter path already selects the whole value
+            if i == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return _freeze(tree)
+
+
+def parse_fields(spec: Optional[str]) -> Optional[dict]:
+    """Field tree for a `fields=` value; None when no (non-empty) spec was given."""
+    if spec is None or not spec.strip():
+        return None
+    return _thaw(_parse(spec))
+
+
+def canonical_fields(tree: Optional[dict]) -> str:
+    """Stable string form of a tree, e.g. for cache keys: keys sorted, one path per entry."""
+    if tree is None:
+        return ""
+
+    def paths(node: dict, prefix: str):
+        for key in sorted(node):
+            if node[key]:
+                yield from paths(node[key], f"{prefix}{key}.")
+            else:
+                yield prefix + key
+
+    return ",".join(paths(tree, ""))
+
+
+def _key(name: str):
+    # names are checked against FIELD_NAME when parsed, so they can be inlined
+    return literal_column(f"'{name}'")
+
+
+def project_json(expr, tree: dict):
+    """The paths of `tree` inside the JSONB value `expr`, as a JSONB object."""
+    # One jsonb_each() pass per object: every `->` / `?` on a large (TOASTed) document would
+    # decompress it again, which costs more than the bytes saved.
+    entry = func.jsonb_each(expr).table_valued("key", "value").alias()
+    nested = {name: sub for name, sub in tree.items() if sub}
+    value = entry.c.value
+    if nested:
+        value = case(
+            *[(entry.c.key == _key(name), project_json(entry.c.value, sub)) for name, sub in nested.items()],
+            else_=entry.c.value,
+        )
+    picked = (
+        select(func.coalesce(func.jsonb_object_agg(entry.c.key, value), literal_column("'{}'::jsonb")))
+        .where(entry.c.key.in_([_key(name) for name in tree]))
+        .scalar_subquery()
+    )
+    # arrays, scalars and nulls are returned whole
+    return type_coerce(case((func.jsonb_typeof(expr) == literal_column("'object'"), picked), else_=expr), JSONB)
+
+
+def project_dict(value: Any, tree: Optional[dict]) -> Any:
+    """`project_json` for a decoded document."""
+    if not tree or not isinstance(value, dict):
+        return value
+    return {name: project_dict(v, tree[name]) for name, v in value.items() if name in tree}
+
+
+def project_row(columns: dict, tree: Optional[dict], always: tuple = ("id",)):
+    """
+    json_build_object() of the selected `columns` ({response key: column}). Top-level names in
+    `tree` pick columns and anything below them projects inside that column's JSONB;
+    `always` keys are included even if not asked for. Without a tree every column is returned.
+    """
+    if tree is None:
+        tree = {name: {} for name in columns}
+    unknown = [name for name in tree if name not in columns]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    args = []
+    for name, column in columns.items():
+        if name in tree:
+            sub = tree[name]
+            if sub and not isinstance(column.type, JSON):
+                raise InvalidFields(f"{name!r} is not a JSON field, it can only be selected whole")
+            args += [_key(name), project_json(column, sub) if sub else column]
+        elif name in always:
+            args += [_key(name), column]
+    return func.json_build_object(*args)
@@ -0,0 +1,160 @@
+"""
+Content-addressed uploads of remote images/files into R2 (or any S3-compatible bucket).
+
+A local manifest records, per key prefix and source URL, the ETag / Last-Modified the origin
+sent, the SHA-256 of the body and the object key it was stored under. Re-runs send conditional
+GETs and skip unchanged sources entirely (304). The manifest is written every
+R2_MANIFEST_FLUSH_EVERY new records, at exit, and when `flush()` is called. Objects are keyed by content hash, so identical
+images (the same logo used by several campuses, ...) are stored once.
+
+Bodies are streamed: the download is hashed while it is spooled to a small in-memory buffer
+that rolls over to a temp file, then handed to `upload_fileobj` (multipart for large files).
+"""
+import atexit
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from typing import Optional
+from urllib.parse import urlparse, unquote
+
+import requests
+
+R2_MANIFEST_PATH = os.getenv(
+    "R2_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "r2_manifest.json"),
+)
+R2_MANIFEST_FLUSH_EVERY = int(os.getenv("R2_MANIFEST_FLUSH_EVERY", "50"))
+SPOOL_MAX_BYTES = 1 << 20
+CHUNK_BYTES = 1 << 16
+
+
+class UploadManifest:
+    def __init__(self, path: str = R2_MANIFEST_PATH, flush_every: int = R2_MANIFEST_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        # {key_prefix: {url: entry}}
+        self._entries: dict[str, dict[str, dict]] = {}
+        try:
+            with open(path) as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key_prefix: str, url: str) -> Optional[dict]:
+        return self._entries.get(key_prefix, {}).get(url)
+
+    def record(self, key_prefix: str, url: str, entry: dict):
+        with self._lock:
+            self._entries.setdefault(key_prefix, {})[url] = entry
+            self._unsaved += 1
+            if self._unsaved >= self.flush_every:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            if self._unsaved:
+                self._write()
+
+    def _write(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+
+_default_manifest: Optional[UploadManifest] = None
+_default_manifest_lock = threading.Lock()
+
+
+def default_manifest() -> UploadManifest:
+    global _default_manifest
+    with _default_manifest_lock:
+        if _default_manifest is None:
+            _default_manifest = UploadManifest()
+            atexit.register(_default_manifest.flush)
+        return _default_manifest
+
+
+def _extension(url: str, content_type: str) -> str:
+    filename = unquote(os.path.basename(urlparse(url).path))
+    ext = os.path.splitext(filename)[1].lower()
+    if not ext or not re.fullmatch(r"\.[a-z0-9]{1,5}", ext):
+        ext = mimetypes.guess_extension(content_type) or ".bin"
+    return ext
+
+
+def _object_exists(r2, bucket: str, key: str) -> bool:
+    try:
+        r2.head_object(Bucket=bucket, Key=key)
+        return True
+    except r2.exceptions.ClientError as e:
+        if int(e.response['Error']['Code']) != 404:
+            raise
+        return False
+
+
+def store_url_in_r2(
+    url: str,
+    r2,
+    bucket: str,
+    public_url: str,
+    key_prefix: str = "uploads/",
+    http=requests,
+    manifest: Optional[UploadManifest] = None,
+    acl: Optional[str] = None,
+) -> str:
+    """Copy `url` into the bucket under `<key_prefix><sha256><ext>`; returns its public URL."""
+    manifest = manifest or default_manifest()
+    public_url = public_url.rstrip("/")
+    previous = manifest.get(key_prefix, url)
+
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    with http.get(url, headers=headers, stream=True, timeout=30) as resp:
+        if resp.status_code == 304 and previous:
+            return f"{public_url}/{previous['key']}"
+        if resp.status_code != 200:
+            raise Exception(f"Failed to download file from {url}")
+
+        content_type = resp.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            for chunk in resp.iter_content(CHUNK_BYTES):
+                digest.update(chunk)
+                spool.write(chunk)
+            sha256 = digest.hexdigest()
+            key = f"{key_prefix}{sha256}{_extension(url, content_type)}"
+
+            unchanged = previous and previous.get("sha256") == sha256 and previous.get("key") == key
+            if not unchanged and not _object_exists(r2, bucket, key):
+                spool.seek(0)
+                extra = {"ContentType": content_type}
+                if acl:
+                    extra["ACL"] = acl
+                r2.upload_fileobj(spool, bucket, key, ExtraArgs=extra)
+
+        manifest.record(key_prefix, url, {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "key": key,
+        })
+    return f"{public_url}/{key}"
+
+
+def key_prefix_of(key: str) -> str:
+    """Folder part of a legacy name-based key ("logos/Some_Uni.png" -> "logos/")."""
+    head, _, _ = key.rpartition("/")
+    return f"{head}/" if head else ""
@@ -0,0 +1,73 @@
+"""
+Raw JSON passthrough for endpoints that return large JSONB documents.
+
+Instead of letting psycopg2 parse JSONB into dicts that FastAPI then walks with
+`jsonable_encoder` and re-encodes, the whole response document is assembled in Postgres
+(`json_build_object` / `json_agg`), selected as text and sent as-is:
+
+    stmt = select(json_text(json_object(UniversityModel.id, UniversityModel.attributes))).where(...)
+    body = fetch_json(db, stmt)  # bytes, or None when no row matched
+
+`RawJSONResponse` sends bytes/str untouched and encodes anything else with orjson.
+"""
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import Text, cast, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    # pydantic models, sets, ... : same rules as FastAPI
+    return jsonable_encoder(value)
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RawJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, str):
+            return content.encode("utf-8")
+        return dumps(content)
+
+
+def json_object(*columns, **expressions):
+    """json_build_object('<column name>', column, ..., '<key>', expression, ...); keys keep this order."""
+    args = []
+    for key, expr in [(c.key, c) for c in columns] + list(expressions.items()):
+        # keys are our own identifiers, so inline them rather than binding untyped parameters
+        args += [literal_column(f"'{key}'"), expr]
+    return func.json_build_object(*args)
+
+
+def json_array(expr, order_by=None):
+    """json_agg(expr ORDER BY ...) that yields [] instead of NULL for no rows."""
+    agg = func.json_agg(expr if order_by is None else aggregate_order_by(expr, order_by))
+    return func.coalesce(agg, literal_column("'[]'::json"))
+
+
+def json_text(expr):
+    return cast(expr, Text)
+
+
+def fetch_json(db: Session, stmt, params: Optional[dict] = None) -> Optional[bytes]:
+    text_value = db.execute(stmt, params or {}).scalar()
+    return None if text_value is None else text_value.encode("utf-8")
+
+
+async def fetch_json_async(db: AsyncSession, stmt, params: Optional[dict] = None) -> Optional[bytes]:
+    text_value = (await db.execute(stmt, params or {})).scalar()
+    return None if text_value is None else text_value.encode("utf-8")
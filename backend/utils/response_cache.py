@@ -0,0 +1,180 @@
+"""
+Response cache for the read-only catalogue endpoints.
+
+Entries are the encoded JSON body plus its ETag, keyed by (namespace, key), e.g.
+("universities", "123"). Repeat requests skip the database and serialization entirely,
+and a matching If-None-Match gets a bodyless 304.
+
+Backends:
+  - memory (default): per-process LRU bounded by RESPONSE_CACHE_SIZE entries with a
+    RESPONSE_CACHE_TTL second TTL.
+  - redis: set RESPONSE_CACHE_BACKEND=redis and RESPONSE_CACHE_REDIS_URL (any Redis-protocol
+    server). Shared by all workers, so invalidations from the import scripts reach them too.
+
+The `upsert` classmethods in models/models.py call `response_cache.invalidate(...)`. With
+the memory backend that only clears the importing process; other processes fall back to the TTL.
+Composite documents (DEPENDENT_NAMESPACES) are invalidated along with every namespace they embed.
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from utils.cache import TTLCache
+from utils.raw_json import RawJSONResponse, dumps
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for RESPONSE_CACHE_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger("response_cache")
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# namespace -> namespaces whose entries (under the same key) embed its data
+DEPENDENT_NAMESPACES = {
+    "universities": ("universities_full",),
+    "scholarships": ("universities_full",),
+    "program_details": ("universities_full",),
+}
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, namespace: str, key: str) -> Optional[tuple[str, bytes]]:
+        return self._cache.get((namespace, key))
+
+    def set(self, namespace: str, key: str, etag: str, body: bytes):
+        self._cache.set((namespace, key), (etag, body))
+
+    def delete(self, namespace: str, key: Optional[str] = None):
+        if key is None:
+            self._cache.discard_where(lambda k: k[0] == namespace)
+        else:
+            self._cache.pop((namespace, key))
+
+
+class RedisBackend:
+    blocking = True  # network round trips: keep them off the event loop
+
+    def __init__(self, url: str, ttl: float, prefix: str = "respcache"):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the `redis` package")
+        self._client = redis.Redis.from_url(url)
+        self._ttl = int(ttl)
+        self._prefix = prefix
+
+    def _name(self, namespace: str, key: str) -> str:
+        return f"{self._prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[tuple[str, bytes]]:
+        raw = self._client.get(self._name(namespace, key))
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return etag.decode(), body
+
+    def set(self, namespace: str, key: str, etag: str, body: bytes):
+        self._client.set(self._name(namespace, key), etag.encode() + b"\n" + body, ex=self._ttl)
+
+    def delete(self, namespace: str, key: Optional[str] = None):
+        if key is not None:
+            self._client.delete(self._name(namespace, key))
+            return
+        names = list(self._client.scan_iter(match=self._name(namespace, "*"), count=500))
+        if names:
+            self._client.delete(*names)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def _respond(self, request: Request, etag: str, body: bytes) -> Response:
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return RawJSONResponse(content=body, headers={"ETag": etag})
+
+    def lookup(self, request: Request, namespace: str, key: str) -> Optional[Response]:
+        """Cached response for (namespace, key), or None on a miss."""
+        try:
+            entry = self.backend.get(namespace, key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._respond(request, *entry)
+
+    def store(self, request: Request, namespace: str, key: str, payload: Any) -> Response:
+        """Encode `payload` (or take it as-is if already bytes, see utils/raw_json), cache it and build the response."""
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        try:
+            self.backend.set(namespace, key, etag, body)
+        except Exception:
+            logger.exception("Response cache store failed")
+        return self._respond(request, etag, body)
+
+    # For async handlers: the same calls, moved to the threadpool when the backend does I/O.
+    async def lookup_async(self, request: Request, namespace: str, key: str) -> Optional[Response]:
+        if self.backend.blocking:
+            return await run_in_threadpool(self.lookup, request, namespace, key)
+        return self.lookup(request, namespace, key)
+
+    async def store_async(self, request: Request, namespace: str, key: str, payload: Any) -> Response:
+        if self.backend.blocking:
+            return await run_in_threadpool(self.store, request, namespace, key, payload)
+        return self.store(request, namespace, key, payload)
+
+    def invalidate(self, namespace: str, key: Any = None):
+        self.invalidations += 1
+        key = None if key is None else str(key)
+        try:
+            for ns in (namespace, *DEPENDENT_NAMESPACES.get(namespace, ())):
+                self.backend.delete(ns, key)
+        except Exception:
+            logger.exception("Response cache invalidation failed")
+
+    def stats(self) -> dict:
+        return {
+            "backend": RESPONSE_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+def _backend_from_env():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(RESPONSE_CACHE_REDIS_URL, RESPONSE_CACHE_TTL)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+response_cache = ResponseCache(_backend_from_env())
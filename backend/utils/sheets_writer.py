@@ -0,0 +1,242 @@
+"""
+Write-behind appender for the consultation Google Sheet.
+
+`submit(row)` appends the row to a local JSON-lines journal and an in-memory buffer and
+returns immediately. A background thread sends buffered rows with one `append_rows` call
+whenever SHEETS_BATCH_SIZE rows are waiting or SHEETS_FLUSH_SECONDS have passed, and then
+drops them from the journal. If the sheet is slow or down, rows stay journaled and are
+retried with backoff.
+
+Each process journals to its own `<pid>.jsonl` in SHEETS_JOURNAL_DIR and holds an flock on
+`<pid>.lock` while running; on start a writer adopts (re-sends, then deletes) journals whose
+lock no live process holds.
+
+The worksheet comes from a factory that is called once, on the writer thread, so the
+credentials/authorize/open_by_key round trips happen at startup rather than per request.
+SHEETS_BACKEND=memory swaps in `MemoryWorksheet` (development, tests).
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no journal locking, so don't share a journal dir between processes
+    fcntl = None
+
+logger = logging.getLogger("sheets_writer")
+
+SHEETS_BACKEND = os.getenv("SHEETS_BACKEND", "google")
+SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", "50"))
+SHEETS_FLUSH_SECONDS = float(os.getenv("SHEETS_FLUSH_SECONDS", "2"))
+SHEETS_MAX_BACKOFF = float(os.getenv("SHEETS_MAX_BACKOFF", "60"))
+SHEETS_JOURNAL_DIR = os.getenv(
+    "SHEETS_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sheets_journal"),
+)
+
+
+def google_worksheet():
+    """sheet1 of EXCEL_FILE_ID, authorized with GOOGLE_SERVICE_ACCOUNT_FILE."""
+    from google.oauth2 import service_account
+    import gspread
+
+    creds = service_account.Credentials.from_service_account_file(
+        os.environ.get("GOOGLE_SERVICE_ACCOUNT_FILE"),
+        scopes=["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    )
+    return gspread.authorize(creds).open_by_key(os.environ.get("EXCEL_FILE_ID")).sheet1
+
+
+class MemoryWorksheet:
+    """Stand-in for a gspread worksheet that keeps appended rows in a list."""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.rows: list[list] = []
+        self.calls = 0
+        self.fail_times = fail_times
+        self.delay = delay
+
+    def append_rows(self, rows, value_input_option="RAW"):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("simulated sheets outage")
+        self.rows.extend(rows)
+
+
+class SheetsWriter:
+    def __init__(
+        self,
+        worksheet_factory: Callable,
+        journal_dir: str = SHEETS_JOURNAL_DIR,
+        batch_size: int = SHEETS_BATCH_SIZE,
+        flush_seconds: float = SHEETS_FLUSH_SECONDS,
+        max_backoff: float = SHEETS_MAX_BACKOFF,
+    ):
+        self.worksheet_factory = worksheet_factory
+        self.journal_dir = journal_dir
+        self.journal_path = os.path.join(journal_dir, f"{os.getpid()}.jsonl")
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_backoff = max_backoff
+        self.worksheet = None
+        self._buffer: list[list] = []
+        self._cond = threading.Condition()
+        self._journal = None
+        self._lockfile = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._counters = {"submitted": 0, "written": 0, "batches": 0, "errors": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._lockfile = open(self.journal_path[:-len(".jsonl")] + ".lock", "w")
+            self._try_lock(self._lockfile)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._buffer = self._adopt_journals()
+            if self._buffer:
+                logger.info("Re-sending %d journaled rows", len(self._buffer))
+                self._rewrite_journal()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="sheets-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Flush what is buffered (one last attempt) and stop the writer thread."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lockfile is not None:
+                self._lockfile.close()
+                self._lockfile = None
+
+    def submit(self, row: list):
+        with self._cond:
+            if self._journal is None:
+                raise RuntimeError("SheetsWriter is not started")
+            self._journal.write(json.dumps(row) + "\n")
+            self._journal.flush()
+            self._buffer.append(row)
+            self._counters["submitted"] += 1
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    @staticmethod
+    def _try_lock(f) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _adopt_journals(self) -> list[list]:
+        """Rows from journals left behind by stopped/crashed writers (and ours, if the pid was reused)."""
+        rows = []
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.jsonl"))):
+            own = path == self.journal_path
+            lock_path = path[:-len(".jsonl")] + ".lock"
+            with open(lock_path, "a") as lock:
+                if not own and not self._try_lock(lock):
+                    continue  # a running process owns it
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                rows.append(json.loads(line))
+                            except ValueError:
+                                pass  # torn last line from a crash mid-write
+                except FileNotFoundError:
+                    continue  # adopted by another process meanwhile
+                if not own:
+                    os.remove(path)
+                    os.remove(lock_path)
+        return rows
+
+    def _rewrite_journal(self):
+        # caller holds self._cond; keeps only rows not yet written to the sheet
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row) + "\n" for row in self._buffer)
+        reopen = self._journal is not None
+        if reopen:
+            self._journal.close()
+        os.replace(tmp, self.journal_path)
+        if reopen:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _connect(self) -> bool:
+        try:
+            self.worksheet = self.worksheet_factory()
+            return True
+        except Exception:
+            logger.exception("Could not open the worksheet; will retry on the next flush")
+            return False
+
+    def _run(self):
+        self._connect()
+        backoff = 0.0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + (backoff or self.flush_seconds)
+                while not self._stopping:
+                    if not backoff and len(self._buffer) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                stopping = self._stopping
+                batch = self._buffer[:self.batch_size]
+            if batch and not self._flush(batch):
+                if stopping:
+                    logger.warning("Stopping with %d rows left in %s", len(self._buffer), self.journal_path)
+                    return
+                backoff = min(self.max_backoff, max(1.0, backoff * 2))
+                continue
+            backoff = 0.0
+            if stopping and not self._buffer:
+                return
+
+    def _flush(self, batch: list[list]) -> bool:
+        if self.worksheet is None and not self._connect():
+            with self._cond:
+                self._counters["errors"] += 1
+            return False
+        try:
+            self.worksheet.append_rows(batch, value_input_option="RAW")
+        except Exception:
+            logger.exception("Appending %d rows to the sheet failed; will retry", len(batch))
+            with self._cond:
+                self._counters["errors"] += 1
+            return False
+        with self._cond:
+            del self._buffer[:len(batch)]
+            self._counters["written"] += len(batch)
+            self._counters["batches"] += 1
+            self._rewrite_journal()
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._counters, "pending": len(self._buffer)}
+
+
+sheets_writer = SheetsWriter(MemoryWorksheet if SHEETS_BACKEND == "memory" else google_worksheet)
@@ -1,15 +1,146 @@
-from typing import Iterable, List
-from ..models.models import University, ShortlistPreference, ShortlistItem
+"""
+University shortlist scoring.
+
+`ShortlistCatalogue` keeps the universities column-wise (tuition as a float array, interned
+country codes, an exact-name program -> university positions index), so a preference is
+scored for every university with a handful of numpy operations. Countries match
+case-insensitively; programs match exactly, as `prefs.program in u.programs` always did. Only the top-k winners are
+selected (partial selection, not a full sort) and turned into `ShortlistItem`s.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models.models import Program, University, ShortlistPreference, ShortlistItem
+
+SHORTLIST_CATALOGUE_TTL = float(os.getenv("SHORTLIST_CATALOGUE_TTL", "3600"))
+
+
+@dataclass
+class ShortlistWeights:
+    base: float = 0.5
+    country: float = 0.2
+    program: float = 0.2
+    budget: float = 0.1
+
+
+class ShortlistCatalogue:
+    def __init__(self, unis: Iterable[University]):
+        self.ids: list[int] = []
+        self.names: list[str] = []
+        self.countries: list[str] = []
+        self.programs: list[list[str]] = []
+        country_codes: dict[str, int] = {}
+        codes, tuition = [], []
+        by_program: dict[str, list[int]] = {}
+        for i, u in enumerate(unis):
+            self.ids.append(u.id)
+            self.names.append(u.name)
+            self.countries.append(u.country)
+            self.programs.append(u.programs)
+            codes.append(country_codes.setdefault(u.country.lower(), len(country_codes)))
+            tuition.append(np.nan if u.tuition is None else u.tuition)
+            for p in set(u.programs):
+                by_program.setdefault(p, []).append(i)
+        self.country_codes = country_codes
+        self.country_code = np.asarray(codes, dtype=np.int32)
+        # NaN (unknown) never satisfies a budget
+        self.tuition = np.asarray(tuition, dtype=np.float64)
+        self.by_program = {p: np.asarray(ix, dtype=np.int64) for p, ix in by_program.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, prefs: ShortlistPreference, weights: ShortlistWeights = ShortlistWeights()) -> np.ndarray:
+        scores = np.full(len(self), weights.base)
+        if prefs.country:
+            code = self.country_codes.get(prefs.country.lower())
+            if code is not None:
+                scores[self.country_code == code] += weights.country
+        if prefs.program:
+            hits = self.by_program.get(prefs.program)
+            if hits is not None:
+                scores[hits] += weights.program
+        if prefs.budget:
+            scores[self.tuition <= prefs.budget] += weights.budget
+        return scores
+
+    def shortlist(
+        self,
+        prefs: ShortlistPreference,
+        k: Optional[int] = None,
+        weights: ShortlistWeights = ShortlistWeights(),
+    ) -> List[ShortlistItem]:
+        scores = self.scores(prefs, weights)
+        return [self.item(i, scores[i]) for i in top_k(scores, k).tolist()]
+
+    def item(self, i: int, score: float) -> ShortlistItem:
+        tuition = self.tuition[i]
+        return ShortlistItem(
+            university=self.names[i],
+            country=self.countries[i],
+            tuition=None if np.isnan(tuition) else int(tuition),
+            programs=self.programs[i],
+            match_score=round(float(score), 2),
+        )
+
+
+def top_k(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """Positions of the k best scores, best first; ties keep catalogue order (like a stable sort)."""
+    n = scores.size
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - above.size]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -scores[chosen]))]
+
 
 def score_universities(unis: Iterable[University], prefs: ShortlistPreference) -> List[ShortlistItem]:
-    items: List[ShortlistItem] = []
-    for u in unis:
-        score = 0.5
-        if prefs.country and prefs.country.lower() == u.country.lower():
-            score += 0.2
-        if prefs.program and prefs.program in u.programs:
-            score += 0.2
-        if prefs.budget and u.tuition <= prefs.budget:
-            score += 0.1
-        items.append(ShortlistItem(university=u.name, country=u.country, tuition=u.tuition, programs=u.programs, match_score=round(score,2)))
-    return sorted(items, key=lambda x: x.match_score, reverse=True)
+    return ShortlistCatalogue(unis).shortlist(prefs)
+
+
+def load_catalogue(db) -> ShortlistCatalogue:
+    """One entry per school in `programs`; tuition is its cheapest known program."""
+    rows = db.execute(
+        select(
+            Program.school_id,
+            func.max(Program.school_name),
+            func.max(Program.country),
+            func.min(Program.tuition),
+            func.array_agg(func.distinct(Program.attributes["name"].astext)),
+        )
+        .where(Program.school_id.isnot(None))
+        .group_by(Program.school_id)
+        .order_by(Program.school_id)
+    )
+    return ShortlistCatalogue(
+        University.model_construct(
+            id=school_id, name=name or "", country=country or "", tuition=tuition,
+            programs=[p for p in programs if p],
+        )
+        for school_id, name, country, tuition, programs in rows
+    )
+
+
+_catalogue: Optional[ShortlistCatalogue] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalogue(db) -> ShortlistCatalogue:
+    """Process-wide catalogue, rebuilt from the DB after SHORTLIST_CATALOGUE_TTL seconds."""
+    global _catalogue, _loaded_at
+    with _lock:
+        if _catalogue is None or time.monotonic() - _loaded_at > SHORTLIST_CATALOGUE_TTL:
+            _catalogue = load_catalogue(db)
+            _loaded_at = time.monotonic()
+        return _catalogue
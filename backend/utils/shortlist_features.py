@@ -0,0 +1,261 @@
+"""
+Precomputed per-university features for profile-weighted shortlist ranking.
+
+A nightly job builds one row per school (same order as the shortlist catalogue: school_id
+ascending) into a structured .npy file:
+
+    python -m utils.shortlist_features build [--out data/shortlist_features.npy]
+
+Workers `np.load(..., mmap_mode="r")` it, so the OS page cache holds a single copy shared by
+every process. Scoring is the usual preference match (utils/shortlist) plus
+`features @ profile_weights` plus a budget-fit term, all vectorized.
+
+Feature values are scaled to 0..1; unknowns get the column mean so they neither help nor
+hurt much.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from models.models import ShortlistPreference
+from utils.shortlist import ShortlistCatalogue, ShortlistWeights, top_k
+
+logger = logging.getLogger("shortlist_features")
+
+FEATURE_COLUMNS = (
+    "scholarship_count",    # scholarships offered (ScholarshipModel by school id + AustraliaScholarship by name)
+    "max_award",            # largest fixed award amount
+    "ranking",              # best rank in all_universities.latest_rankings (1.0 = top)
+    "living_affordability", # cheaper living_costs_annual_AUD -> higher
+    "tuition_affordability",
+    "program_breadth",      # number of distinct programs
+)
+FEATURE_DTYPE = np.dtype([("id", "<i8"), ("x", "<f4", (len(FEATURE_COLUMNS),))])
+
+SHORTLIST_FEATURES_PATH = os.getenv(
+    "SHORTLIST_FEATURES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "shortlist_features.npy"),
+)
+SHORTLIST_PROFILES_PATH = os.getenv("SHORTLIST_PROFILES_PATH")
+
+# feature weights plus "budget_fit" (tuition vs the requested budget) and the match weights
+# of the plain shortlist ("country", "program", "budget").
+DEFAULT_PROFILES: dict[str, dict[str, float]] = {
+    "balanced": {"country": 0.2, "program": 0.2, "budget": 0.0, "budget_fit": 0.15,
+                 "scholarship_count": 0.1, "max_award": 0.05, "ranking": 0.15,
+                 "living_affordability": 0.05, "tuition_affordability": 0.05, "program_breadth": 0.05},
+    "budget": {"country": 0.2, "program": 0.2, "budget": 0.0, "budget_fit": 0.3,
+               "scholarship_count": 0.1, "max_award": 0.1, "living_affordability": 0.2,
+               "tuition_affordability": 0.2},
+    "prestige": {"country": 0.2, "program": 0.2, "budget": 0.0, "budget_fit": 0.05,
+                 "ranking": 0.5, "program_breadth": 0.1},
+    "funding": {"country": 0.2, "program": 0.2, "budget": 0.0, "budget_fit": 0.1,
+                "scholarship_count": 0.3, "max_award": 0.3},
+}
+
+
+def load_profiles(path: Optional[str] = SHORTLIST_PROFILES_PATH) -> dict[str, dict[str, float]]:
+    """Built-in profiles, overridden/extended by the JSON object in SHORTLIST_PROFILES_PATH."""
+    profiles = dict(DEFAULT_PROFILES)
+    if path:
+        with open(path) as f:
+            profiles.update(json.load(f))
+    return profiles
+
+
+_RANK_RE = re.compile(r"\d+")
+
+
+def _best_rank(rankings) -> Optional[int]:
+    """Smallest rank found anywhere in a latest_rankings blob ("#34", "=45", "201-250", 12, ...)."""
+    best = None
+    stack = [rankings]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+            continue
+        if isinstance(value, list):
+            stack.extend(value)
+            continue
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            candidates = [int(value)]
+        elif isinstance(value, str):
+            # skip years ("QS 2025: #34")
+            candidates = [n for n in map(int, _RANK_RE.findall(value)) if not 1900 <= n <= 2100][:1]
+        else:
+            continue
+        for rank in candidates:
+            if 0 < rank < 5000:
+                best = rank if best is None else min(best, rank)
+    return best
+
+
+def _scaled(values: list[Optional[float]], invert: bool = False) -> np.ndarray:
+    arr = np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+    known = ~np.isnan(arr)
+    if known.any():
+        lo, hi = arr[known].min(), arr[known].max()
+        arr[known] = (arr[known] - lo) / (hi - lo) if hi > lo else 1.0
+        if invert:
+            arr[known] = 1.0 - arr[known]
+        arr[~known] = arr[known].mean()
+    else:
+        arr[:] = 0.0
+    return arr
+
+
+def _table_exists(db, name: str) -> bool:
+    return db.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": name}).scalar()
+
+
+def build_features(db) -> np.ndarray:
+    schools = db.execute(text("""
+        SELECT school_id, lower(max(school_name)), min(tuition),
+               count(DISTINCT attributes ->> 'name')
+        FROM programs WHERE school_id IS NOT NULL
+        GROUP BY school_id ORDER BY school_id
+    """)).all()
+
+    scholarships = {
+        sid: (n, award) for sid, n, award in db.execute(text("""
+            SELECT "schoolGroupId", count(*),
+                   max("awardAmountFrom") FILTER (WHERE "awardAmountType" = 'fixed_amount')
+            FROM scholarships GROUP BY "schoolGroupId"
+        """))
+    } if _table_exists(db, "scholarships") else {}
+    au_scholarships = {
+        name: n for name, n in db.execute(text("""
+            SELECT lower(university), COALESCE(jsonb_array_length(scholarships), 0)
+            FROM australia_scholarships WHERE jsonb_typeof(scholarships) = 'array'
+        """))
+    } if _table_exists(db, "australia_scholarships") else {}
+    universities = {
+        name: (rankings, living) for name, rankings, living in db.execute(text("""
+            SELECT lower(name), latest_rankings, living_costs_annual_aud FROM all_universities
+        """))
+    } if _table_exists(db, "all_universities") else {}
+
+    counts, awards, ranks, living, tuition, breadth = [], [], [], [], [], []
+    for sid, name, min_tuition, n_programs in schools:
+        n, award = scholarships.get(sid, (0, None))
+        counts.append(math.log1p(n + au_scholarships.get(name, 0)))
+        awards.append(None if award is None else math.log1p(float(award)))
+        rankings, living_cost = universities.get(name, (None, None))
+        rank = _best_rank(rankings) if rankings is not None else None
+        ranks.append(None if rank is None else -math.log(rank))
+        living.append(None if living_cost is None else float(living_cost))
+        tuition.append(min_tuition)
+        breadth.append(math.log1p(n_programs))
+
+    out = np.zeros(len(schools), dtype=FEATURE_DTYPE)
+    out["id"] = [row[0] for row in schools]
+    out["x"] = np.column_stack([
+        _scaled(counts), _scaled(awards), _scaled(ranks),
+        _scaled(living, invert=True), _scaled(tuition, invert=True), _scaled(breadth),
+    ]) if len(schools) else np.zeros((0, len(FEATURE_COLUMNS)))
+    return out
+
+
+def write_features(features: np.ndarray, path: str = SHORTLIST_FEATURES_PATH):
+    # Replace atomically: workers that mapped the old file keep reading the old inode.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npy"
+    np.save(tmp, features)
+    os.replace(tmp, path)
+
+
+class FeatureScorer:
+    def __init__(self, features: np.ndarray, profiles: Optional[dict] = None):
+        self.features = features
+        self.profiles = profiles if profiles is not None else load_profiles()
+        self._aligned: tuple[Optional[ShortlistCatalogue], Optional[np.ndarray]] = (None, None)
+
+    @classmethod
+    def open(cls, path: str = SHORTLIST_FEATURES_PATH, profiles: Optional[dict] = None) -> "FeatureScorer":
+        return cls(np.load(path, mmap_mode="r"), profiles)
+
+    def _matrix_for(self, catalogue: ShortlistCatalogue) -> np.ndarray:
+        cached_for, matrix = self._aligned
+        if cached_for is catalogue:
+            return matrix
+        ids = np.asarray(catalogue.ids, dtype=np.int64)
+        if ids.shape == self.features["id"].shape and np.array_equal(ids, self.features["id"]):
+            matrix = self.features["x"]  # same order: use the shared mapping directly
+        else:
+            # Catalogue changed since the nightly build: private aligned copy, zeros for new schools.
+            logger.info("Shortlist features out of date with the catalogue; aligning")
+            matrix = np.zeros((ids.size, len(FEATURE_COLUMNS)), dtype=np.float32)
+            pos = np.searchsorted(self.features["id"], ids)
+            pos = np.minimum(pos, max(len(self.features) - 1, 0))
+            found = (self.features["id"][pos] == ids) if len(self.features) else np.zeros(ids.size, bool)
+            matrix[found] = self.features["x"][pos[found]]
+        self._aligned = (catalogue, matrix)
+        return matrix
+
+    def weights(self, profile: str) -> tuple[ShortlistWeights, np.ndarray, float]:
+        p = self.profiles[profile]
+        match = ShortlistWeights(base=0.0, country=p.get("country", 0.0), program=p.get("program", 0.0), budget=p.get("budget", 0.0))
+        w = np.asarray([p.get(c, 0.0) for c in FEATURE_COLUMNS], dtype=np.float32)
+        return match, w, p.get("budget_fit", 0.0)
+
+    def scores(self, catalogue: ShortlistCatalogue, prefs: ShortlistPreference, profile: str) -> np.ndarray:
+        match, w, budget_fit = self.weights(profile)
+        scores = catalogue.scores(prefs, match)
+        scores += self._matrix_for(catalogue) @ w
+        if prefs.budget and budget_fit:
+            # 1 within budget, falling linearly to 0 at twice the budget; unknown tuition scores 0
+            over = np.maximum(catalogue.tuition - prefs.budget, 0) / prefs.budget
+            scores += budget_fit * np.nan_to_num(np.clip(1 - over, 0, 1), nan=0.0)
+        return scores
+
+    def shortlist(self, catalogue: ShortlistCatalogue, prefs: ShortlistPreference, profile: str, k: int):
+        scores = self.scores(catalogue, prefs, profile)
+        return [catalogue.item(i, scores[i]) for i in top_k(scores, k).tolist()]
+
+
+_scorer: Optional[FeatureScorer] = None
+_scorer_mtime: Optional[float] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_scorer(path: str = SHORTLIST_FEATURES_PATH) -> Optional[FeatureScorer]:
+    """Mapped feature file, re-opened when the nightly build replaces it (checked once a minute)."""
+    global _scorer, _scorer_mtime, _checked_at
+    with _lock:
+        if time.monotonic() - _checked_at > 60 or _scorer is None:
+            _checked_at = time.monotonic()
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                return None
+            if mtime != _scorer_mtime:
+                _scorer, _scorer_mtime = FeatureScorer.open(path), mtime
+        return _scorer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the shortlist feature matrix")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=SHORTLIST_FEATURES_PATH)
+    args = parser.parse_args()
+    from db import SessionLocal
+
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        features = build_features(db)
+    write_features(features, args.out)
+    print(f"Wrote {len(features)} rows x {len(FEATURE_COLUMNS)} features to {args.out} "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,192 @@
+"""
+Streaming importer for the large JSON data files (data/scholarship.json, university and
+program dumps, ...).
+
+Items of the top-level JSON array are parsed one at a time, validated/normalized and
+written with `bulk_upsert` in bounded batches, so memory stays flat regardless of file
+size. After every committed batch the number of source items consumed is written to a
+checkpoint file; re-running the same import resumes after the last committed batch.
+
+    python -m utils.stream_import scholarships data/scholarship.json [--batch-size 500]
+"""
+import argparse
+import json
+import logging
+import os
+from typing import Any, Callable, Iterator, Optional, TextIO
+
+from models.models import (
+    AustraliaScholarship, Program, ProgramDetail, ScholarshipModel, UniversityModel, bulk_upsert,
+)
+
+logger = logging.getLogger("stream_import")
+
+_WS = " \t\r\n"
+
+
+def iter_json_array(fp: TextIO, read_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array from `fp` without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = fp.read(read_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("Expected a top-level JSON array")
+    pos += 1
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "]":
+        return
+    while True:
+        skip_ws()
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+            if not eof:
+                # Until the next ',' / ']' is buffered the value may be cut short
+                # (a number like "2." decodes as 2), so read more before trusting it.
+                nxt = end
+                while nxt < len(buf) and buf[nxt] in _WS:
+                    nxt += 1
+                is_number = isinstance(item, (int, float)) and not isinstance(item, bool)
+                if nxt == len(buf) or (is_number and buf[nxt] not in ",]"):
+                    raise ValueError("need more data")
+        except ValueError:
+            if eof:
+                raise ValueError(f"Truncated or invalid JSON near offset {pos}")
+            fill()
+            continue
+        pos = end
+        yield item
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        if buf[pos] != ",":
+            raise ValueError(f"Expected ',' or ']' near offset {pos}")
+        pos += 1
+
+
+def require(*keys: str) -> Callable[[Any], dict]:
+    """Normalizer that rejects items which aren't objects or lack any of `keys`."""
+    def normalize(item: Any) -> dict:
+        if not isinstance(item, dict):
+            raise ValueError("item is not an object")
+        missing = [k for k in keys if item.get(k) in (None, "")]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        return item
+    return normalize
+
+
+# dataset name -> (model, normalizer)
+DATASETS = {
+    "scholarships": (ScholarshipModel, require("id")),
+    "australia_scholarships": (AustraliaScholarship, require("university")),
+    "universities": (UniversityModel, require("id")),
+    "programs": (Program, require("id")),
+    "program_details": (ProgramDetail, require("id")),
+}
+
+
+def _fingerprint(path: str) -> dict:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime}
+
+
+def _read_checkpoint(checkpoint_path: str, fingerprint: dict) -> int:
+    try:
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if saved.get("source") != fingerprint:
+        logger.warning("Checkpoint %s is for a different file version; starting over", checkpoint_path)
+        return 0
+    return int(saved.get("position", 0))
+
+
+def _write_checkpoint(checkpoint_path: str, fingerprint: dict, position: int):
+    tmp = checkpoint_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"source": fingerprint, "position": position}, f)
+    os.replace(tmp, checkpoint_path)
+
+
+def stream_import(
+    path: str,
+    model,
+    normalize: Callable[[Any], dict] = require("id"),
+    batch_size: int = 500,
+    checkpoint_path: Optional[str] = None,
+    db_factory: Optional[Callable] = None,
+) -> dict:
+    """
+    Import the JSON array in `path` into `model`. Returns counts of items imported,
+    rejected by `normalize`, and skipped because an earlier run already committed them.
+    """
+    if db_factory is None:
+        from db import SessionLocal as db_factory
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    fingerprint = _fingerprint(path)
+    resume_at = _read_checkpoint(checkpoint_path, fingerprint)
+    if resume_at:
+        print(f"Resuming {path} after item {resume_at}")
+
+    stats = {"imported": 0, "rejected": 0, "skipped": resume_at}
+    batch: list[dict] = []
+    position = 0
+
+    def flush():
+        if batch:
+            bulk_upsert(db, model, batch, chunk_size=len(batch))
+            stats["imported"] += len(batch)
+            batch.clear()
+        _write_checkpoint(checkpoint_path, fingerprint, position)
+        print(f"  {position} items processed ({stats['imported']} imported, {stats['rejected']} rejected)")
+
+    with open(path, encoding="utf-8") as fp, db_factory() as db:
+        for position, item in enumerate(iter_json_array(fp), start=1):
+            if position <= resume_at:
+                continue
+            try:
+                batch.append(normalize(item))
+            except ValueError as e:
+                stats["rejected"] += 1
+                logger.warning("Rejected item %d of %s: %s", position, path, e)
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+    # Completed: the next run should start from the beginning again.
+    os.remove(checkpoint_path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a JSON array file into the database")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args()
+    model, normalize = DATASETS[args.dataset]
+    print(stream_import(args.path, model, normalize, batch_size=args.batch_size, checkpoint_path=args.checkpoint))